@@ -5,10 +5,13 @@ import argparse
 import os
 import sys
 from datetime import datetime as dt
+from typing import TYPE_CHECKING, Optional
 
-from stigAnsible import StigAnsible
-from stigGenerator import StigGenerator
-from stigParser import Benchmark, Group, Preference, Profile, StigParser
+# Each mode imports the stig modules it runs in one place, at the top of its
+# run_ function, so that the help text does not pay for any of them.
+if TYPE_CHECKING:
+    from stigBatch import BatchResult
+    from stigParser import Benchmark, Group, Preference, Profile
 
 ENCODING: str = "utf-8"
 
@@ -20,67 +23,255 @@ def main() -> None:
         description="Generate Custom STIG profile baseline of yor choice.")
     if (len(sys.argv)) == 1:
         arg_parser.print_help()
-    arg_parser.add_argument("-i", dest="in_path", type=str, required=True,
-                            help="Path to STIG Zip file")
+    arg_parser.add_argument("-i", dest="in_path", type=str, required=False, nargs="+",
+                            help="Path to STIG Zip file (several files require an answer file)")
+    arg_parser.add_argument("-d", dest="library_path", type=str, required=False,
+                            help="Directory or glob of STIG and STIG Ansible Zip files to process with an answer file (library mode)")
     arg_parser.add_argument("-o", dest="out_path", type=str, required=False,
                             help="Directory for modified STIG Zip file (default: input directory)")
-    arg_parser.add_argument("-a", dest="ansible_path", type=str, required=False,
+    arg_parser.add_argument("-a", dest="ansible_path", type=str, required=False, nargs="+",
                             help="Path to STIG Ansible Zip file")
+    arg_parser.add_argument("-s", dest="stream_ansible", action="store_true",
+                            help="Copy the kept Ansible tasks as they are instead of re-serializing them")
+    arg_parser.add_argument("-b", dest="answer_path", type=str, required=False,
+                            help="Path to answer file for non-interactive (batch) mode")
+    arg_parser.add_argument("-j", dest="jobs", type=int, required=False,
+                            help="Number of STIG files processed in parallel in batch mode (default: CPU count)")
+    arg_parser.add_argument("-c", dest="cache_path", type=str, required=False,
+                            help="Directory to cache parsed STIG benchmarks in")
+    arg_parser.add_argument("-m", dest="metrics", action="store_true",
+                            help="Save time and memory used by each stage to metrics.json")
+    arg_parser.add_argument("-u", dest="previous_path", type=str, required=False,
+                            help="Output folder of a previous run on an older release, to review only new or changed rules")
+    arg_parser.add_argument("-M", dest="memory_limit", type=int, required=False,
+                            help="Memory limit per worker in MB in library mode")
+    arg_parser.add_argument("-k", dest="inventory_path", type=str, required=False,
+                            help="Path to a CSV host inventory, to write a STIG Viewer checklist per host")
 
     args: argparse.Namespace = arg_parser.parse_args()
 
-    stig_file: str = os.path.abspath(args.in_path)
-    if (stig_file.endswith(".zip") is False):
-        raise Exception("Invalid input parameter.")
+    if ((args.in_path is None) == (args.library_path is None)):
+        raise Exception("Provide either STIG zip files or a library.")
+    if (args.library_path):
+        run_library(args)
+        print("Completed.")
+        return
+
+    stig_files: list[str] = [os.path.abspath(p) for p in args.in_path]
+    for stig_file in stig_files:
+        if (stig_file.endswith(".zip") is False):
+            raise Exception("Invalid input parameter.")
+    if (len(stig_files) > 1 and args.answer_path is None):
+        raise Exception("Multiple STIG zip files require an answer file.")
+
+    if (args.out_path is None):
+        output_dir: str = os.path.dirname(stig_files[0])  # Default value
+    else:
+        output_dir = os.path.abspath(args.out_path)
+    if (os.path.isdir(output_dir) is False):
+        raise Exception("Invalid otput parameter.")
+
+    ansible_zip_files: list[str] = []
+    if (args.ansible_path):
+        ansible_zip_files = [os.path.abspath(p) for p in args.ansible_path]
+        for ansible_zip_file in ansible_zip_files:
+            if (ansible_zip_file.endswith(".zip") is False):
+                raise Exception("Invalid input parameter.")
+
+    cache_dir: Optional[str] = None
+    if (args.cache_path):
+        cache_dir = os.path.abspath(args.cache_path)
+
+    inventory_file: Optional[str] = get_inventory(args)
+
+    previous_dir: Optional[str] = None
+    if (args.previous_path):
+        if (args.answer_path):
+            raise Exception("Upgrade mode is only available in interactive mode.")
+        previous_path: str = os.path.abspath(args.previous_path)
+        if (os.path.isdir(previous_path) is False):
+            raise Exception("Invalid previous run parameter.")
+        previous_dir = previous_path
+
+    # Start processing
+    if (args.answer_path is None):
+        if (len(ansible_zip_files) > 1):
+            raise Exception("Provide one STIG Ansible zip file for the STIG zip file.")
+        run_interactive(stig_file=stig_files[0], output_dir=output_dir, ansible_zip_file=next(iter(ansible_zip_files), None), cache_dir=cache_dir,
+                        stream_ansible=args.stream_ansible, metrics=args.metrics, previous_dir=previous_dir, inventory_file=inventory_file)
+    else:
+        # Every STIG is measured in its own worker and gets its own report
+        run_batch(stig_files=stig_files, ansible_files=ansible_zip_files, output_dir=output_dir, answer_file=os.path.abspath(args.answer_path),
+                  workers=args.jobs, cache_dir=cache_dir, stream_ansible=args.stream_ansible, metrics=args.metrics, inventory_file=inventory_file)
+
+    print("Completed.")
+
+
+def run_library(args: argparse.Namespace) -> None:
+    from stigBatch import (MAX_TASKS_PER_CHILD, AnswerFile, BatchJob,
+                           BatchResult, StigBatch)
+
+    if (args.answer_path is None):
+        raise Exception("Library mode requires an answer file.")
+    if (args.ansible_path):
+        raise Exception("Ansible zip files are paired from the library.")
+
+    library_path: str = os.path.abspath(args.library_path)
+    ansible_pairs, unpaired = StigBatch.find_library(path=library_path)
+    if (len(ansible_pairs) == 0):
+        raise Exception("No STIG zip file found in the library.")
 
     if (args.out_path is None):
-        output_dir: str = os.path.dirname(stig_file)  # Default value
+        output_dir: str = library_path  # Default value
+        if (os.path.isdir(output_dir) is False):
+            output_dir = os.path.dirname(library_path)
     else:
         output_dir = os.path.abspath(args.out_path)
     if (os.path.isdir(output_dir) is False):
         raise Exception("Invalid otput parameter.")
 
-    # Create folder for task
+    cache_dir: Optional[str] = None
+    if (args.cache_path):
+        cache_dir = os.path.abspath(args.cache_path)
+
+    inventory_file: Optional[str] = get_inventory(args)
+
+    answers: AnswerFile = AnswerFile.load(os.path.abspath(args.answer_path))
+
+    # Every STIG gets the same folder layout as a single interactive run,
+    # e.g. <output>/U_X_V1R1_STIG/baseliner_<timestamp>
     timestamp: str = dt.now().strftime("%Y%m%d%H%M%S")
     task_dir: str = f"baseliner_{timestamp}"
-    os.mkdir(os.path.join(
-        output_dir, task_dir))
-    output_dir = os.path.join(output_dir, task_dir)
+    jobs: list[BatchJob] = []
+    for stig_file, ansible_zip_file in ansible_pairs.items():
+        job_dir: str = os.path.join(output_dir, os.path.basename(
+            stig_file).removesuffix(".zip"), task_dir)
+        os.makedirs(job_dir)
+        jobs.append(BatchJob(stig_file=stig_file, output_dir=job_dir,
+                    ansible_file=ansible_zip_file, cache_dir=cache_dir, stream_ansible=args.stream_ansible, metrics=args.metrics, inventory_file=inventory_file))
 
-    ansible_zip_file: str = ""
-    generate_ansible: bool = False
-    if (args.ansible_path):
-        generate_ansible = True
-        ansible_zip_file = os.path.abspath(args.ansible_path)
-        if (ansible_zip_file.endswith(".zip") is False):
-            raise Exception("Invalid input parameter.")
+    results: list[BatchResult] = StigBatch.run(
+        jobs=jobs, answers=answers, workers=args.jobs, memory_limit=args.memory_limit, max_tasks_per_child=MAX_TASKS_PER_CHILD)
 
-    # Start processing
-    stig_parser: StigParser = StigParser.parse_zip(zip_file=stig_file)
-    benchmark: Benchmark = stig_parser.Benchmark
+    summary_file: str = os.path.join(output_dir, f"{task_dir}_summary.json")
+    StigBatch.save_summary(
+        path=summary_file, results=results, unpaired=unpaired)
 
-    selected_profile: Profile = StigGenerator.prompt_profile(
-        benchmark=benchmark)
-    selected_groups: list[Group] = StigGenerator.filter_groups(
-        benchmark=benchmark, selected_profile=selected_profile)
+    failed: int = print_results(results)
+    for ansible_zip_file in unpaired:
+        print(f"{os.path.basename(ansible_zip_file)}: SKIPPED: No STIG zip file found")
+    print(f"Summary: {summary_file}")
+    if (failed > 0):
+        raise Exception(f"{failed} of {len(results)} STIG files failed.")
 
-    print(f"{len(selected_groups)} rules selected out of {len(benchmark.Group)} by selecting profile \"{selected_profile.title}\"")
 
-    preferences: list[Preference] = StigGenerator.prompt_preferences(
-        selected_groups=selected_groups)
+def run_interactive(stig_file: str, output_dir: str, ansible_zip_file: Optional[str], cache_dir: Optional[str], stream_ansible: bool, metrics: bool = False, previous_dir: Optional[str] = None, inventory_file: Optional[str] = None) -> None:
+    from stigGenerator import (DEFAULT_DESCRIPTION, DEFAULT_TITLE,
+                               StigGenerator)
+    from stigMetrics import METRICS_FILE, StigMetrics
+    from stigPrompt import StigPrompt
+    from stigZip import StigArchive
 
-    custom_profile: Profile = StigGenerator.get_custom_profile(
-        preferences=preferences)
+    output_dir = create_task_dir(output_dir)
+    if (metrics):
+        StigMetrics.enable()
 
-    StigGenerator.generate(stig_file, output_dir,
-                           benchmark, preferences, custom_profile)
+    with StigArchive(stig_file) as stig_archive:
+        benchmark: Benchmark = StigGenerator.load_benchmark(
+            archive=stig_archive, cache_dir=cache_dir)
 
-    if (generate_ansible):
-        script: StigAnsible = StigAnsible()
-        script.generate(
-            ansible_zip=ansible_zip_file, output_directory=output_dir)
+        selected_profile: Profile = StigPrompt.prompt_profile(
+            benchmark=benchmark)
+        selected_groups: list[Group] = StigGenerator.filter_groups(
+            benchmark=benchmark, selected_profile=selected_profile)
 
-    print("Completed.")
+        print(f"{len(selected_groups)} rules selected out of {len(benchmark.Group)} by selecting profile \"{selected_profile.title}\"")
+
+        default_title: str = DEFAULT_TITLE
+        default_description: str = DEFAULT_DESCRIPTION
+        if (previous_dir):
+            # Only new or changed rules are prompted, the other decisions are kept
+            from stigUpgrade import REPORT_FILE, StigUpgrade
+            upgrade: StigUpgrade = StigUpgrade(previous_directory=previous_dir)
+            carried, changes = upgrade.compare(selected_groups=selected_groups)
+            StigPrompt.carry_over(preferences=carried)
+            StigUpgrade.save_report(changes=changes, previous_zip=upgrade.previous_zip,
+                                    carried=len(carried), path=os.path.join(output_dir, REPORT_FILE))
+            print(f"{len(carried)} decisions carried over from {os.path.basename(upgrade.previous_zip)}, {len(changes)} rules changed")
+            if (upgrade.profile is not None):
+                default_title = upgrade.profile.title
+                default_description = upgrade.profile.description
+
+        preferences: list[Preference] = StigPrompt.prompt_preferences(
+            selected_groups=selected_groups)
+
+        custom_profile: Profile = StigPrompt.get_custom_profile(
+            preferences=preferences, default_title=default_title, default_description=default_description)
+
+        StigGenerator.export(stig_archive=stig_archive, output_dir=output_dir, benchmark=benchmark, preferences=preferences,
+                             custom_profile=custom_profile, ansible_file=ansible_zip_file, stream_ansible=stream_ansible)
+        if (inventory_file):
+            hosts: int = StigGenerator.write_checklists(stig_archive=stig_archive, benchmark=benchmark, preferences=preferences,
+                                                        inventory_file=inventory_file, output_dir=output_dir)
+            print(f"{hosts} checklists written")
+        StigPrompt.cleanup()
+
+    if (metrics):
+        StigMetrics.save(os.path.join(output_dir, METRICS_FILE))
+
+
+def run_batch(stig_files: list[str], ansible_files: list[str], output_dir: str, answer_file: str, workers: Optional[int], cache_dir: Optional[str], stream_ansible: bool, metrics: bool, inventory_file: Optional[str] = None) -> None:
+    from stigBatch import AnswerFile, BatchJob, BatchResult, StigBatch
+
+    ansible_pairs: dict[str, Optional[str]] = StigBatch.pair_ansible(
+        stig_files=stig_files, ansible_files=ansible_files)
+    answers: AnswerFile = AnswerFile.load(answer_file)
+    output_dir = create_task_dir(output_dir)
+
+    jobs: list[BatchJob] = []
+    for stig_file, ansible_zip_file in ansible_pairs.items():
+        # A single STIG keeps the interactive layout, several get a folder each
+        job_dir: str = output_dir
+        if (len(ansible_pairs) > 1):
+            job_dir = os.path.join(output_dir, os.path.basename(
+                stig_file).removesuffix(".zip"))
+            os.mkdir(job_dir)
+        jobs.append(BatchJob(stig_file=stig_file, output_dir=job_dir,
+                    ansible_file=ansible_zip_file, cache_dir=cache_dir, stream_ansible=stream_ansible, metrics=metrics, inventory_file=inventory_file))
+
+    results: list[BatchResult] = StigBatch.run(
+        jobs=jobs, answers=answers, workers=workers)
+
+    failed: int = print_results(results)
+    if (failed > 0):
+        raise Exception(f"{failed} of {len(results)} STIG files failed.")
+
+
+def create_task_dir(output_dir: str) -> str:
+    timestamp: str = dt.now().strftime("%Y%m%d%H%M%S")
+    task_dir: str = os.path.join(output_dir, f"baseliner_{timestamp}")
+    os.mkdir(task_dir)
+    return task_dir
+
+
+def get_inventory(args: argparse.Namespace) -> Optional[str]:
+    if (args.inventory_path is None):
+        return None
+    inventory_file: str = os.path.abspath(args.inventory_path)
+    if (os.access(inventory_file, os.R_OK) is False):
+        raise Exception("Invalid inventory parameter.")
+    return inventory_file
+
+
+def print_results(results: list['BatchResult']) -> int:
+    failed: int = 0
+    for result in results:
+        if (result.error is None):
+            print(f"{os.path.basename(result.stig_file)}: {result.selected - result.rejected} of {result.selected} rules accepted")
+        else:
+            failed += 1
+            print(f"{os.path.basename(result.stig_file)}: ERROR: {result.error}")
+    return failed
 
 
 if __name__ == "__main__":
@@ -1,55 +1,118 @@
+import io
 import os
 import re
 import xml.etree.ElementTree as ET
-from typing import Optional
+from typing import Any, Iterable, Optional
 
 import ruamel.yaml
 
-from stigOs import StigOs
-from stigZip import StigZip
+from stigMetrics import StigMetrics
+from stigZip import StigArchive
 
 ENCODING: str = "utf-8"
 
+STIGRULE_PATTERN: re.Pattern[str] = re.compile(r"^stigrule_([0-9]+)_.*")
+LINE_PATTERN: re.Pattern[str] = re.compile(r"[^\n]*\n|[^\n]+$")
+TASK_START_PATTERN: re.Pattern[str] = re.compile(r"^-(\s|$)")
+# Plain or quoted scalar names only, anything fancier goes through ruamel
+TASK_NAME_PATTERN: re.Pattern[str] = re.compile(
+    r"""^(?:- |  )name\s*:\s+(['"]?)([^\s'"|>{}\[\]&*!%@`#][^\r\n]*?)\1\s*$""")
+LISTEN_PATTERN: re.Pattern[str] = re.compile(r"^\s+listen\s*:", re.MULTILINE)
+ROLE_TEXT_PATTERN: re.Pattern[str] = re.compile(r"\.(ya?ml|j2)$", re.IGNORECASE)
+
+# Paths in the role folder, e.g. roles/rhel8STIG/tasks/main.yml
+TASKS_FILE: str = "tasks/main.yml"
+HANDLERS_FILE: str = "handlers/main.yml"
+
 
 class StigAnsible:
 
+    streaming: bool
     loader: ruamel.yaml.YAML
     dumper: ruamel.yaml.YAML
 
-    def __init__(self) -> None:
+    def __init__(self, streaming: bool = False) -> None:
+        self.streaming = streaming
         self.loader = self.__get_loader()
         self.dumper = self.__get_dumper()
 
-    def generate(self, ansible_zip: str, output_directory: str) -> None:
-        data_in: list = self.load_from_zip(
-            ansible_zip, output_directory)
-
-        denylist: list[str] = self.__generate_denylist(output_directory)
-
-        data_out: list = self.filter_denied(
-            data_in=data_in, denylist=denylist)
+    def generate(self, ansible_zip: str, output_directory: str, denylist: Optional[list[str]] = None) -> None:
+        # Without a denylist, the rejected rules are read from rationale.xml
+        if (denylist is None):
+            denylist = self.__generate_denylist(output_directory)
 
         export_path: str = os.path.join(
             output_directory, "custom.tasks.main.yml")
-        self.dump(path=export_path, data_out=data_out)
-        StigOs.remove_with_pattern(output_directory=output_directory,
-                                   pattern="*-ansible.zip")
+        with StigArchive(ansible_zip) as archive:
+            role_archive: Optional[StigArchive] = archive.open_ansible_zip()
+            if (role_archive is None):
+                raise Exception("Ansible zip file could not be found.")
+            with role_archive:
+                with StigMetrics.span("ansible_load"):
+                    tasks: str = bytes.decode(
+                        role_archive.read_ansible_tasks(), encoding=ENCODING)
+                    if (self.streaming is False):
+                        data_in: list = self.load_from_str(text=tasks)
+                with StigMetrics.span("ansible_filter"):
+                    # One partition serves both the tasks file and the role package
+                    if (self.streaming):
+                        text_out, text_skipped = self.partition_text(
+                            text=tasks, denylist=denylist)
+                    else:
+                        data_out, data_skipped = self.partition(
+                            data_in=data_in, denylist=denylist)
+                with StigMetrics.span("ansible_dump"):
+                    if (self.streaming):
+                        self.dump_text(path=export_path, text=text_out)
+                    else:
+                        text_out = self.dumps(data_out=data_out)
+                        text_skipped = self.dumps(data_out=data_skipped)
+                        self.__write(path=export_path, text=text_out)
+                with StigMetrics.span("ansible_package"):
+                    self.generate_package(role_archive=role_archive, tasks=text_out,
+                                          skipped=text_skipped, output_directory=output_directory)
+
+    def generate_package(self, role_archive: StigArchive, tasks: str, skipped: str, output_directory: str) -> str:
+        # The custom role zip is the original one with the filtered tasks, and
+        # without the handlers that only the skipped tasks notified. Every
+        # other member, variables included, is copied as it is, without being
+        # inflated. Playbooks and inventories outside the role may use them.
+        tasks_name: str = role_archive.tasks_name
+        handlers_name: str = tasks_name.removesuffix(TASKS_FILE) + HANDLERS_FILE
+        replaced: list[str] = [tasks_name, handlers_name]
+        replacements: dict[str, bytes] = {tasks_name: tasks.encode(ENCODING)}
+
+        # Templates and other task files may notify handlers too
+        used: list[str] = [tasks] + [self.__read_text(role_archive, n) for n in role_archive.find_members(ROLE_TEXT_PATTERN)
+                                     if n not in replaced]
+
+        if (role_archive.has_member(handlers_name)):
+            handlers: str = self.__read_text(role_archive, handlers_name)
+            handlers_out: str = self.__filter_handlers(
+                text=handlers, skipped=skipped, used=''.join(used))
+            if (handlers_out != handlers):
+                replacements[handlers_name] = handlers_out.encode(ENCODING)
+
+        path: str = os.path.join(output_directory, role_archive.custom_name)
+        role_archive.repack(path=path, replacements=replacements)
+        return path
 
     def load_from_file(self, path: str) -> list:
         with open(path, 'r', encoding=ENCODING) as file:
             text: str = file.read()
             return self.load_from_str(text=text)
 
-    def load_from_zip(self, ansible_zip: str, output_directory: str) -> list:
-        extractedfile: Optional[str] = StigZip.extract_ansible_zip(zip_file_path=ansible_zip,
-                                                                   output_directory=output_directory)
-        if (extractedfile is None):
-            raise Exception("Ansible zip file could not be found.")
+    def load_from_zip(self, ansible_zip: str) -> list:
+        return self.load_from_str(self.load_text_from_zip(ansible_zip))
 
-        tasks: str = bytes.decode(StigZip.read_ansible_tasks(
-            os.path.join(output_directory, extractedfile)), encoding=ENCODING)
-
-        return self.load_from_str(tasks)
+    def load_text_from_zip(self, ansible_zip: str) -> str:
+        # The role zip nested in the STIG Ansible zip is never written to disk
+        with StigArchive(ansible_zip) as archive:
+            role_archive: Optional[StigArchive] = archive.open_ansible_zip()
+            if (role_archive is None):
+                raise Exception("Ansible zip file could not be found.")
+            with role_archive:
+                return bytes.decode(role_archive.read_ansible_tasks(), encoding=ENCODING)
 
     def load_from_str(self, text: str) -> list:
         def __handle_exclamation_mark(text: str) -> str:
@@ -72,6 +135,9 @@ class StigAnsible:
         return self.loader.load(__handle_exclamation_mark(text=text))
 
     def dump(self, path: str, data_out: list) -> None:
+        self.__write(path=path, text=self.dumps(data_out=data_out))
+
+    def dumps(self, data_out: list) -> str:
         # Each task is a list item and requires offset of 0
         # But other list items need to be indented with an offset of 2
         # Solution is to indent first and strip later
@@ -87,30 +153,159 @@ class StigAnsible:
                     res.append(line[2:])
             return ''.join(res)
 
-        with open(path, "w", encoding=ENCODING) as file:
-            self.dumper.dump(data_out, file, transform=strip_first_two)
-
-    def filter_denied(self, data_in: list, denylist: list[str]) -> list:
-        # Complexity O(m x n) where m: number of tasks and n: number of denied rules
-        def __filter_out(elem: dict, denylist: list[str]) -> Optional[dict]:
-            name: str = elem['name']
-            pattern: re.Pattern[str] = re.compile(r"^stigrule_([0-9]+)_.*")
-            match: re.Match[str] | None = pattern.match(name)
-            if (match):
-                number: str = match.group(1)
-                for _, denied in enumerate(denylist):
-                    if (denied == number):
-                        return None
+        stream: io.StringIO = io.StringIO()
+        self.dumper.dump(data_out, stream, transform=strip_first_two)
+        return stream.getvalue()
 
-            return elem
+    def dump_text(self, path: str, text: str) -> None:
+        # Keep line endings exactly as they were in the source file
+        with open(path, "w", encoding=ENCODING, newline="") as file:
+            file.write(text)
 
-        data_out: list = []
+    def filter_denied(self, data_in: list, denylist: list[str]) -> list:
+        data_out, _ = self.partition(data_in=data_in, denylist=denylist)
+        return data_out
 
+    def partition(self, data_in: list, denylist: Optional[Iterable[str]] = None, allowlist: Optional[Iterable[str]] = None) -> tuple[list, list]:
+        # Complexity O(m) where m: number of tasks
+        # Tasks of denied rules, or of rules missing from the allowlist, are skipped.
+        # Tasks that do not belong to a rule are always enforced.
+        denied: set[str] = StigAnsible.__to_rule_numbers(denylist or [])
+        allowed: Optional[set[str]] = None
+        if (allowlist is not None):
+            allowed = StigAnsible.__to_rule_numbers(allowlist)
+
+        enforce: list = []
+        skip: list = []
         for elem in data_in:
-            if (__filter_out(elem, denylist) is not None):
-                data_out.append(elem)
+            number: Optional[str] = StigAnsible.get_rule_number(
+                elem.get('name'))
+            if (number is not None and (number in denied or (allowed is not None and number not in allowed))):
+                skip.append(elem)
+            else:
+                enforce.append(elem)
+
+        return enforce, skip
+
+    def filter_denied_text(self, text: str, denylist: list[str]) -> str:
+        text_out, _ = self.partition_text(text=text, denylist=denylist)
+        return text_out
+
+    def partition_text(self, text: str, denylist: Optional[Iterable[str]] = None, allowlist: Optional[Iterable[str]] = None) -> tuple[str, str]:
+        # Same decisions as partition(), but tasks are copied as they are in the source.
+        # Complexity O(size of the text), ruamel is only used for tasks without a plain name.
+        denied: set[str] = StigAnsible.__to_rule_numbers(denylist or [])
+        allowed: Optional[set[str]] = None
+        if (allowlist is not None):
+            allowed = StigAnsible.__to_rule_numbers(allowlist)
+
+        header, blocks = StigAnsible.split_tasks(text=text)
+        if (len(blocks) == 0 and StigAnsible.__has_content(header)):
+            # Only lists starting at column 0 are split. An indented list, e.g.
+            # "  - name: ...", is valid YAML too and is left to ruamel.
+            data_out, data_skipped = self.partition(
+                data_in=self.load_from_str(text=text), denylist=denied, allowlist=allowed)
+            return self.dumps(data_out=data_out), self.dumps(data_out=data_skipped)
+
+        enforce: list[str] = [header]
+        skip: list[str] = []
+        for block in blocks:
+            number: Optional[str] = StigAnsible.get_rule_number(
+                self.__get_block_name(block))
+            if (number is not None and (number in denied or (allowed is not None and number not in allowed))):
+                skip.append(block)
+            else:
+                enforce.append(block)
+
+        return ''.join(enforce), ''.join(skip)
+
+    @staticmethod
+    def split_tasks(text: str) -> tuple[str, list[str]]:
+        # Each top level list item is a task. Anything before the first task,
+        # e.g. the document start marker and comments, is returned as the header.
+        # Comments and blank lines at column 0 between two tasks go with the
+        # task that follows them, so they are removed together.
+        lines: list[str] = LINE_PATTERN.findall(text)
+        header: list[str] = []
+        blocks: list[list[str]] = []
+        pending: list[str] = []
+        for line in lines:
+            if (TASK_START_PATTERN.match(line)):
+                blocks.append(pending + [line])
+                pending = []
+            elif (len(blocks) == 0):
+                header.append(line)
+            elif (line.strip() == "" or line.startswith("#")):
+                pending.append(line)
+            else:
+                blocks[-1].extend(pending)
+                blocks[-1].append(line)
+                pending = []
+        if (len(blocks) > 0):
+            blocks[-1].extend(pending)
+        return ''.join(header), [''.join(b) for b in blocks]
+
+    @staticmethod
+    def get_rule_number(name: Any) -> Optional[str]:
+        if (isinstance(name, str) is False):
+            return None
+        match: Optional[re.Match[str]] = STIGRULE_PATTERN.match(name)
+        if (match):
+            return match.group(1)
+        return None
+
+    def __get_block_name(self, block: str) -> Optional[str]:
+        # The name is either on the first line or a key of the task mapping
+        for line in LINE_PATTERN.findall(block):
+            match: Optional[re.Match[str]] = TASK_NAME_PATTERN.match(line)
+            if (match):
+                return match.group(2)
+
+        # Flow mappings, block scalars and the like are left to the YAML parser
+        data: Any = self.load_from_str(block)
+        if (isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict)):
+            return data[0].get('name')
+        return None
+
+    def __filter_handlers(self, text: str, skipped: str, used: str) -> str:
+        # A handler goes when only skipped tasks notify it. Handlers listening
+        # to a topic, or notified by another handler, are kept.
+        # Another file or handler refers to a name when the combined text has
+        # more references than the handler itself.
+        header, blocks = StigAnsible.split_tasks(text=text)
+        combined: str = used + ''.join(blocks)
+        handlers_out: list[str] = [header]
+        for block in blocks:
+            name: Optional[str] = self.__get_block_name(block)
+            if (name is None or LISTEN_PATTERN.search(block)
+                    or StigAnsible.__count_references(skipped, name) == 0
+                    or StigAnsible.__count_references(combined, name) > StigAnsible.__count_references(block, name)):
+                handlers_out.append(block)
+        return ''.join(handlers_out)
+
+    @staticmethod
+    def __has_content(header: str) -> bool:
+        # Anything but blank lines, comments, directives and document markers
+        return any(line.strip() != "" and line.startswith(("#", "%", "---", "...")) is False
+                   for line in LINE_PATTERN.findall(header))
+
+    @staticmethod
+    def __count_references(text: str, name: str) -> int:
+        return len(re.findall(rf"(?<![\w-]){re.escape(name)}(?![\w-])", text))
+
+    @staticmethod
+    def __write(path: str, text: str) -> None:
+        with open(path, "w", encoding=ENCODING) as file:
+            file.write(text)
 
-        return data_out
+    @staticmethod
+    def __read_text(archive: StigArchive, name: str) -> str:
+        return bytes.decode(archive.read(name), encoding=ENCODING, errors="replace")
+
+    @staticmethod
+    def __to_rule_numbers(rules: Iterable[str]) -> set[str]:
+        # Both "V-230000" and "230000" are accepted
+        return {r.removeprefix("V-") for r in rules}
 
     def __get_loader(self) -> ruamel.yaml.YAML:
         yaml: ruamel.yaml.YAML = ruamel.yaml.YAML()
@@ -0,0 +1,262 @@
+import glob
+import json
+import os
+import sys
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from datetime import datetime as dt
+from typing import Any, Optional
+
+from stigGenerator import StigGenerator
+from stigMetrics import METRICS_FILE, StigMetrics
+from stigParser import Benchmark, Group, Preference, Profile
+from stigZip import StigArchive
+
+ENCODING: str = "utf-8"
+
+# Library mode workers are replaced after a few STIG files to give memory back
+MAX_TASKS_PER_CHILD: int = 4
+
+ACCEPT: str = "accept"
+REJECT: str = "reject"
+
+
+@dataclass
+class Decision:
+    id: str
+    applicable: bool
+    rationale: str
+
+    @staticmethod
+    def from_dict(id: str, obj: Any) -> 'Decision':
+        # Either "accept" or {"decision": "reject", "rationale": "..."}
+        if (isinstance(obj, str)):
+            obj = {"decision": obj}
+        _decision: str = str(obj.get("decision", ACCEPT)).lower()
+        if (_decision not in (ACCEPT, REJECT)):
+            raise Exception(
+                f"Invalid decision for {id}: {_decision}. Use \"{ACCEPT}\" or \"{REJECT}\".")
+        _applicable: bool = _decision == ACCEPT
+        _rationale: str = str(obj.get("rationale", ""))
+        # Same rule as the interactive prompt
+        if (_applicable is False and len(_rationale) < 3):
+            raise Exception(
+                f"Rejected rule {id} needs a rationale of at least 3 chars.")
+        return Decision(id, _applicable, _rationale)
+
+
+@dataclass
+class AnswerFile:
+    profile: str
+    title: str
+    description: str
+    decisions: dict[str, Decision]
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'AnswerFile':
+        if (obj.get("profile") is None):
+            raise Exception("Answer file must define a profile.")
+        _profile: str = str(obj.get("profile"))
+        _title: str = str(obj.get("title", ""))
+        _description: str = str(obj.get("description", ""))
+        _decisions: dict[str, Decision] = {
+            id: Decision.from_dict(id, y) for id, y in obj.get("rules", {}).items()}
+        return AnswerFile(_profile, _title, _description, _decisions)
+
+    @staticmethod
+    def load(path: str) -> 'AnswerFile':
+        with open(path, "r", encoding=ENCODING) as file:
+            return AnswerFile.from_dict(json.load(file))
+
+    def select_profile(self, benchmark: Benchmark) -> Profile:
+        # Same numbering as the interactive prompt, or the profile id or title
+        if (self.profile.isdigit()):
+            index: int = int(self.profile) - 1
+            if (0 <= index < len(benchmark.Profile)):
+                return benchmark.Profile[index]
+        for profile in benchmark.Profile:
+            if (self.profile in (profile.id, profile.title)):
+                return profile
+        raise Exception(
+            f"Profile \"{self.profile}\" could not be found in {benchmark.id}.")
+
+    def get_preferences(self, selected_groups: list[Group]) -> list[Preference]:
+        # Rules without an answer are accepted, like an empty answer in the prompt
+        preferences: list[Preference] = []
+        for group in selected_groups:
+            decision: Optional[Decision] = self.decisions.get(group.id)
+            if (decision is None or decision.applicable):
+                preferences.append(Preference(
+                    id=group.id, rule=group.Rule.title, applicable=True, rationale=""))
+            else:
+                preferences.append(Preference(
+                    id=group.id, rule=group.Rule.title, applicable=False, rationale=decision.rationale))
+        return preferences
+
+
+@dataclass
+class BatchJob:
+    stig_file: str
+    output_dir: str
+    ansible_file: Optional[str] = None
+    cache_dir: Optional[str] = None
+    stream_ansible: bool = False
+    metrics: bool = False
+    inventory_file: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    stig_file: str
+    output_dir: str
+    selected: int = 0
+    rejected: int = 0
+    error: Optional[str] = None
+
+
+class StigBatch:
+
+    @staticmethod
+    def pair_ansible(stig_files: list[str], ansible_files: list[str]) -> dict[str, Optional[str]]:
+        if (len(stig_files) == 1 and len(ansible_files) == 1):
+            return {stig_files[0]: ansible_files[0]}
+
+        pairs, unpaired = StigBatch.__pair_by_name(
+            stig_files=stig_files, ansible_files=ansible_files)
+        if (len(unpaired) > 0):
+            raise Exception(
+                f"No STIG zip file found for {', '.join(unpaired)}")
+        return pairs
+
+    @staticmethod
+    def find_library(path: str) -> tuple[dict[str, Optional[str]], list[str]]:
+        # A directory, or a glob such as /stigs/U_*.zip. Ansible zips without
+        # a STIG zip are returned separately instead of failing the library.
+        pattern: str = path
+        if (os.path.isdir(path)):
+            pattern = os.path.join(path, "*.zip")
+        files: list[str] = sorted(os.path.abspath(f) for f in glob.glob(pattern)
+                                  if f.lower().endswith(".zip") and os.path.isfile(f))
+        ansible_files: list[str] = [
+            f for f in files if f.lower().endswith("_ansible.zip")]
+        stig_files: list[str] = [f for f in files if f not in ansible_files]
+        return StigBatch.__pair_by_name(stig_files=stig_files, ansible_files=ansible_files)
+
+    @staticmethod
+    def __pair_by_name(stig_files: list[str], ansible_files: list[str]) -> tuple[dict[str, Optional[str]], list[str]]:
+        # U_X_V1R1_STIG.zip pairs with U_X_V1R1_STIG_Ansible.zip. Output folders
+        # are named after the files too, so a name may only be used once.
+        StigBatch.__check_unique(stig_files + ansible_files)
+        pairs: dict[str, Optional[str]] = {}
+        ansible_by_name: dict[str, str] = {os.path.basename(a).lower(): a
+                                           for a in ansible_files}
+        for stig_file in stig_files:
+            name: str = os.path.basename(stig_file).lower().replace(
+                ".zip", "_ansible.zip")
+            pairs[stig_file] = ansible_by_name.pop(name, None)
+        return pairs, sorted(ansible_by_name.values())
+
+    @staticmethod
+    def process(job: BatchJob, answers: AnswerFile) -> BatchResult:
+        with StigArchive(job.stig_file) as stig_archive:
+            benchmark: Benchmark = StigGenerator.load_benchmark(
+                archive=stig_archive, cache_dir=job.cache_dir)
+
+            selected_profile: Profile = answers.select_profile(
+                benchmark=benchmark)
+            selected_groups: list[Group] = StigGenerator.filter_groups(
+                benchmark=benchmark, selected_profile=selected_profile)
+
+            preferences: list[Preference] = answers.get_preferences(
+                selected_groups=selected_groups)
+
+            custom_profile: Profile = StigGenerator.build_custom_profile(
+                preferences=preferences, title=answers.title, description=answers.description)
+
+            StigGenerator.export(stig_archive=stig_archive, output_dir=job.output_dir, benchmark=benchmark, preferences=preferences,
+                                 custom_profile=custom_profile, ansible_file=job.ansible_file, stream_ansible=job.stream_ansible)
+            if (job.inventory_file):
+                StigGenerator.write_checklists(stig_archive=stig_archive, benchmark=benchmark, preferences=preferences,
+                                               inventory_file=job.inventory_file, output_dir=job.output_dir)
+
+        rejected: int = len([p for p in preferences if p.applicable is False])
+        return BatchResult(job.stig_file, job.output_dir, len(selected_groups), rejected)
+
+    @staticmethod
+    def run_job(job: BatchJob, answers: AnswerFile) -> BatchResult:
+        # Runs in a worker process, so failures are reported instead of raised
+        if (job.metrics):
+            StigMetrics.reset()
+            StigMetrics.enable()
+        try:
+            return StigBatch.process(job=job, answers=answers)
+        except Exception as ex:
+            # MemoryError has no message
+            return BatchResult(job.stig_file, job.output_dir, error=str(ex) or type(ex).__name__)
+        finally:
+            if (job.metrics):
+                StigMetrics.save(os.path.join(job.output_dir, METRICS_FILE))
+                StigMetrics.disable()
+
+    @staticmethod
+    def __check_unique(files: list[str]) -> None:
+        seen: dict[str, str] = {}
+        for f in files:
+            name: str = os.path.basename(f).lower()
+            if (name in seen):
+                raise Exception(
+                    f"{seen[name]} and {f} have the same file name. Process them separately.")
+            seen[name] = f
+
+    @staticmethod
+    def run(jobs: list[BatchJob], answers: AnswerFile, workers: Optional[int] = None, memory_limit: Optional[int] = None, max_tasks_per_child: Optional[int] = None) -> list[BatchResult]:
+        if ((len(jobs) <= 1 or workers == 1) and memory_limit is None):
+            return [StigBatch.run_job(job=job, answers=answers) for job in jobs]
+
+        # multiprocessing is only loaded when there are workers to start
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Replacing workers needs Python 3.11, and makes the pool use the spawn
+        # start method. On older versions the workers live for the whole run.
+        options: dict[str, Any] = {}
+        if (max_tasks_per_child is not None and sys.version_info >= (3, 11)):
+            options["max_tasks_per_child"] = max_tasks_per_child
+        with ProcessPoolExecutor(max_workers=workers, initializer=StigBatch.limit_memory,
+                                 initargs=(memory_limit,), **options) as executor:
+            futures: list[Future[BatchResult]] = [executor.submit(
+                StigBatch.run_job, job, answers) for job in jobs]
+            results: list[BatchResult] = []
+            for job, future in zip(jobs, futures):
+                # A worker killed by the OS breaks the pool, report it like any other failure
+                try:
+                    results.append(future.result())
+                except Exception as ex:
+                    results.append(BatchResult(
+                        job.stig_file, job.output_dir, error=str(ex) or type(ex).__name__))
+            return results
+
+    @staticmethod
+    def limit_memory(memory_limit: Optional[int]) -> None:
+        # Runs in each worker. Allocations over the limit raise MemoryError,
+        # which fails the STIG file being processed instead of the machine.
+        if (memory_limit is None or sys.platform == "win32"):
+            return
+        import resource
+        limit: int = memory_limit * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if (hard != resource.RLIM_INFINITY):
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+    @staticmethod
+    def save_summary(path: str, results: list[BatchResult], unpaired: list[str]) -> None:
+        failed: list[BatchResult] = [r for r in results if r.error is not None]
+        summary: dict[str, Any] = {
+            "timestamp": dt.now().isoformat(timespec="seconds"),
+            "total": len(results),
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "results": [asdict(r) for r in results],
+            "unpaired_ansible": unpaired}
+        with open(path, "w", encoding=ENCODING) as file:
+            json.dump(summary, file, indent=4)
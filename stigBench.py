@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime as dt
+from typing import Any, Callable, Optional
+
+from stigAnsible import StigAnsible
+from stigChecklist import StigChecklist
+from stigGenerator import StigGenerator
+from stigParser import Benchmark, Group, Preference, Profile, StigParser
+from stigZip import StigArchive
+from tests.synthetic import StigSynthetic
+
+ENCODING: str = "utf-8"
+
+# Hosts in the synthetic inventory, each one gets a checklist
+CHECKLIST_HOSTS: int = 100
+
+# Time "import main" may add to a bare interpreter, and the modules it must not load
+IMPORT_BUDGET: float = 0.05
+LAZY_MODULES: list[str] = ["stigParser", "stigAnsible", "stigGenerator", "ruamel.yaml",
+                           "colorama", "multiprocessing", "zipfile"]
+
+
+class StigBench:
+
+    @staticmethod
+    def measure(stage: str, repeat: int, func: Callable[[], Any]) -> tuple[dict[str, Any], Any]:
+        timings: list[float] = []
+        result: Any = None
+        for _ in range(repeat):
+            start: float = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return {"stage": stage, "runs": repeat, "min": min(timings),
+                "mean": statistics.fmean(timings), "max": max(timings)}, result
+
+    @staticmethod
+    def measure_retained(func: Callable[[], Any]) -> int:
+        # Bytes still allocated once func returns, i.e. the size of its result
+        started: bool = tracemalloc.is_tracing() is False
+        if (started):
+            tracemalloc.start()
+        try:
+            before: int = tracemalloc.get_traced_memory()[0]
+            result: Any = func()
+            retained: int = tracemalloc.get_traced_memory()[0] - before
+            del result
+            return retained
+        finally:
+            if (started):
+                tracemalloc.stop()
+
+    @staticmethod
+    def measure_startup(repeat: int) -> dict[str, Any]:
+        # Each run is a fresh interpreter, the cost of the imports only shows there
+        directory: str = os.path.dirname(os.path.realpath(__file__))
+
+        def start(code: str) -> str:
+            return subprocess.run([sys.executable, "-c", code], cwd=directory,
+                                  capture_output=True, text=True, check=True).stdout
+
+        bare, _ = StigBench.measure("python_startup", repeat, lambda: start("pass"))
+        measurement, _ = StigBench.measure(
+            "import_main", repeat, lambda: start("import main"))
+        measurement["import_time"] = measurement["min"] - bare["min"]
+        loaded: list[str] = start(
+            "import sys, main; print(*sys.modules)").split()
+        measurement["eager_modules"] = [m for m in LAZY_MODULES if m in loaded]
+        return measurement
+
+    @staticmethod
+    def check_startup(measurement: dict[str, Any], budget: float) -> None:
+        if (len(measurement["eager_modules"]) > 0):
+            raise Exception(
+                f"main imports {', '.join(measurement['eager_modules'])} at load time.")
+        if (measurement["import_time"] > budget):
+            raise Exception(
+                f"Importing main takes {measurement['import_time'] * 1000:.1f} ms, over the {budget * 1000:.0f} ms budget.")
+
+    @staticmethod
+    def run(groups: int, profiles: int, tasks: int, repeat: int) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+
+        def record(stage: str, func: Callable[[], Any]) -> Any:
+            measurement, result = StigBench.measure(stage, repeat, func)
+            measurement.update(
+                {"groups": groups, "profiles": profiles, "tasks": tasks})
+            results.append(measurement)
+            return result
+
+        with tempfile.TemporaryDirectory(prefix="baseliner_bench_") as directory:
+            stig_zip, ansible_zip = StigSynthetic.generate_zips(
+                directory=directory, groups=groups, profiles=profiles, tasks=tasks)
+            output_dir: str = os.path.join(directory, "output")
+            os.mkdir(output_dir)
+
+            benchmark: Benchmark = record("parse_zip", lambda: StigParser.parse_zip(
+                zip_file=stig_zip)).Benchmark
+            results[-1]["retained_memory"] = StigBench.measure_retained(
+                lambda: StigParser.parse_zip(zip_file=stig_zip).Benchmark)
+
+            selected_groups: list[Group] = record("filter_groups", lambda: [StigGenerator.filter_groups(
+                benchmark=benchmark, selected_profile=p) for p in benchmark.Profile])[0]
+
+            # Every tenth rule is rejected
+            preferences: list[Preference] = [
+                Preference(id=g.id, rule=g.Rule.title, applicable=i % 10 != 0,
+                           rationale="" if i % 10 != 0 else "Benchmark")
+                for i, g in enumerate(selected_groups)]
+            custom_profile: Profile = StigGenerator.build_custom_profile(
+                preferences=preferences, title="Benchmark profile")
+            denylist: list[str] = [p.id.replace("V-", "")
+                                   for p in preferences if p.applicable is False]
+
+            with StigArchive(stig_zip) as stig_archive:
+                xccdf: bytes = stig_archive.read_xccdf()
+                modified_xccdf: bytes = record("inject_profile", lambda: StigGenerator.inject_profile(
+                    custom_profile=custom_profile, xccdf=xccdf))
+                record("generate_stig_zip", lambda: stig_archive.generate_stig_zip(
+                    output_directory=output_dir, modified_xccdf=modified_xccdf))
+
+            inventory_file: str = os.path.join(directory, "inventory.csv")
+            with open(inventory_file, "w", encoding=ENCODING) as file:
+                file.write("host_name,host_ip\n" + ''.join(
+                    f"host{i},10.0.{i // 256}.{i % 256}\n" for i in range(CHECKLIST_HOSTS)))
+            with StigArchive(stig_zip) as stig_archive:
+                checklist: StigChecklist = record("checklist_render", lambda: StigChecklist(
+                    benchmark=benchmark, preferences=preferences, xccdf_name=stig_archive.xccdf_name))
+            record("checklist_write", lambda: checklist.generate(
+                inventory_file=inventory_file, output_directory=output_dir))
+
+            ansible: StigAnsible = StigAnsible()
+            text: str = ansible.load_text_from_zip(ansible_zip=ansible_zip)
+            data_in: list = record(
+                "ansible_load", lambda: ansible.load_from_str(text=text))
+            data_out: list = record("ansible_filter", lambda: ansible.filter_denied(
+                data_in=data_in, denylist=denylist))
+            record("ansible_dump", lambda: ansible.dump(
+                path=os.path.join(output_dir, "custom.tasks.main.yml"), data_out=data_out))
+            record("ansible_filter_text", lambda: ansible.filter_denied_text(
+                text=text, denylist=denylist))
+            text_out, text_skipped = ansible.partition_text(
+                text=text, denylist=denylist)
+            with StigArchive(ansible_zip) as ansible_archive:
+                role_archive: Optional[StigArchive] = ansible_archive.open_ansible_zip()
+                if (role_archive is None):
+                    raise Exception("Ansible zip file could not be found.")
+                with role_archive as role:
+                    record("ansible_package", lambda: ansible.generate_package(
+                        role_archive=role, tasks=text_out, skipped=text_skipped, output_directory=output_dir))
+
+        return results
+
+
+def main() -> None:
+
+    # Handle arguments
+    arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Measure baseliner pipeline stages on synthetic STIG packages.")
+    arg_parser.add_argument("-g", dest="groups", type=int, nargs="+", default=[300, 1000, 10000],
+                            help="Number of rules per benchmark (default: 300 1000 10000)")
+    arg_parser.add_argument("-p", dest="profiles", type=int, default=9,
+                            help="Number of profiles per benchmark (default: 9)")
+    arg_parser.add_argument("-t", dest="tasks", type=float, default=1.0,
+                            help="Ansible tasks per rule (default: 1)")
+    arg_parser.add_argument("-r", dest="repeat", type=int, default=3,
+                            help="Runs per stage (default: 3)")
+    arg_parser.add_argument("-o", dest="out_path", type=str, required=False,
+                            help="Path to JSON results file (default: print only)")
+    arg_parser.add_argument("-b", dest="import_budget", type=float, default=IMPORT_BUDGET * 1000,
+                            help=f"Import time budget of main.py in ms (default: {IMPORT_BUDGET * 1000:.0f})")
+
+    args: argparse.Namespace = arg_parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    startup: dict[str, Any] = StigBench.measure_startup(repeat=max(args.repeat, 5))
+    print(f"{'':>12}  {'import_main':<20} {startup['import_time'] * 1000:>10.1f} ms")
+    results.append(startup)
+    for groups in args.groups:
+        tasks: int = max(1, int(groups * args.tasks))
+        for result in StigBench.run(groups=groups, profiles=args.profiles, tasks=tasks, repeat=args.repeat):
+            print(f"{result['groups']:>6} rules  {result['stage']:<20} {result['min'] * 1000:>10.1f} ms")
+            if ("retained_memory" in result):
+                print(f"{result['groups']:>6} rules  {'benchmark_size':<20} {result['retained_memory'] / 1024:>10.1f} KiB")
+            results.append(result)
+
+    # Checked after the report is written, so a failing run still has its numbers
+    if (args.out_path):
+        report: dict[str, Any] = {
+            "timestamp": dt.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results}
+        with open(os.path.abspath(args.out_path), "w", encoding=ENCODING) as file:
+            json.dump(report, file, indent=4)
+
+    StigBench.check_startup(startup, budget=args.import_budget / 1000)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print('Cancelled by user.')
+        sys.exit(0)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from typing import IO, Any, Optional
+
+from stigParser import Benchmark, Group, Profile, Rule, StigParser
+from stigZip import StigArchive
+
+# Bump when the parsed model changes, so that older entries are discarded
+CACHE_VERSION: int = 4
+CACHE_MAGIC: bytes = b"BASELINER"
+CACHE_HEADER: str = "<9sH"
+CACHE_EXTENSION: str = ".benchmark"
+CACHE_SIZE: int = 512 * 1024 * 1024
+CHUNK_SIZE: int = 1024 * 1024
+ENCODING: str = "utf-8"
+
+
+class StigCache:
+
+    directory: str
+    max_size: int
+
+    def __init__(self, directory: str, max_size: int = CACHE_SIZE) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load_or_parse(self, archive: StigArchive) -> Benchmark:
+        key: str = StigCache.hash_file(archive.path)
+        benchmark: Optional[Benchmark] = self.get(key)
+        if (benchmark is None):
+            benchmark = StigParser.parse_archive(archive=archive).Benchmark
+            self.put(key, benchmark)
+        return benchmark
+
+    def get(self, key: str) -> Optional[Benchmark]:
+        path: str = self.__get_path(key)
+        try:
+            with open(path, "rb") as file:
+                if (StigCache.__read_header(file) != CACHE_VERSION):
+                    raise ValueError("Stale cache entry")
+                # Entries are plain data, read back like the xmltodict output
+                benchmark: Benchmark = Benchmark.from_dict(
+                    json.loads(file.read().decode(ENCODING)))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Stale or corrupt entries are dropped and parsed again
+            self.__remove(path)
+            return None
+
+        # Keep recently used entries away from eviction
+        os.utime(path)
+        return benchmark
+
+    def put(self, key: str, benchmark: Benchmark) -> None:
+        # Write to a temporary file first, so readers never see partial entries
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(struct.pack(CACHE_HEADER, CACHE_MAGIC, CACHE_VERSION))
+                file.write(json.dumps(StigCache.to_dict(benchmark),
+                                      separators=(",", ":")).encode(ENCODING))
+            os.replace(temp_path, self.__get_path(key))
+        except Exception:
+            self.__remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        # Least recently used entries go first
+        entries: list[os.stat_result] = []
+        paths: list[str] = []
+        for name in os.listdir(self.directory):
+            if (name.endswith(CACHE_EXTENSION)):
+                path: str = os.path.join(self.directory, name)
+                try:
+                    entries.append(os.stat(path))
+                    paths.append(path)
+                except FileNotFoundError:
+                    continue
+
+        total: int = sum(e.st_size for e in entries)
+        for entry, path in sorted(zip(entries, paths), key=lambda x: x[0].st_mtime):
+            if (total <= self.max_size):
+                break
+            self.__remove(path)
+            total -= entry.st_size
+
+    @staticmethod
+    def to_dict(benchmark: Benchmark) -> dict[str, Any]:
+        # Same keys as the xmltodict output read by Benchmark.from_dict
+        return {"@id": benchmark.id, "title": benchmark.title, "description": benchmark.description,
+                "version": benchmark.version, "status": {"#text": benchmark.status.text, "@date": benchmark.status.date},
+                "plain-text": [{"#text": p.text, "@id": p.id} for p in benchmark.plain_text],
+                "Profile": [StigCache.__profile_to_dict(p) for p in benchmark.Profile],
+                "Group": [StigCache.__group_to_dict(g) for g in benchmark.Group]}
+
+    @staticmethod
+    def __profile_to_dict(profile: Profile) -> dict[str, Any]:
+        return {"@id": profile.id, "title": profile.title, "description": profile.description,
+                "select": [{"@idref": s.idref, "@selected": s.selected} for s in profile.select]}
+
+    @staticmethod
+    def __group_to_dict(group: Group) -> dict[str, Any]:
+        rule: Rule = group.Rule
+        return {"@id": group.id, "title": group.title, "description": group.description,
+                "Rule": {"@id": rule.id, "@severity": rule.severity, "@weight": rule.weight,
+                         "title": rule.title, "version": rule.version, "description": rule.description,
+                         "check": {"check-content": rule.check.check_content}, "fix": {"@id": rule.fix.id},
+                         "fixtext": {"#text": rule.fixtext.text, "@fixref": rule.fixtext.fixref}}}
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{CACHE_EXTENSION}")
+
+    @staticmethod
+    def __read_header(file: IO[bytes]) -> int:
+        magic, version = struct.unpack(
+            CACHE_HEADER, file.read(struct.calcsize(CACHE_HEADER)))
+        if (magic != CACHE_MAGIC):
+            raise ValueError("Not a cache entry")
+        return version
+
+    @staticmethod
+    def __remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,181 @@
+import csv
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from typing import IO, Any, Iterator, Optional
+from xml.sax.saxutils import escape
+
+from stigMetrics import StigMetrics
+from stigParser import Benchmark, Group, Preference
+
+ENCODING: str = "utf-8"
+
+CHECKLIST_FOLDER: str = "checklists"
+CHECKLIST_EXTENSION: str = ".ckl"
+
+NOT_REVIEWED: str = "Not_Reviewed"
+NOT_APPLICABLE: str = "Not_Applicable"
+
+# Sections of the rule description, in the order STIG Viewer lists them
+DESCRIPTION_TAGS: dict[str, str] = {
+    "Vuln_Discuss": "VulnDiscussion",
+    "IA_Controls": "IAControls",
+    "False_Positives": "FalsePositives",
+    "False_Negatives": "FalseNegatives",
+    "Documentable": "Documentable",
+    "Mitigations": "Mitigations",
+    "Potential_Impact": "PotentialImpacts",
+    "Third_Party_Tools": "ThirdPartyTools",
+    "Mitigation_Control": "MitigationControl",
+    "Responsibility": "Responsibility",
+    "Security_Override_Guidance": "SeverityOverrideGuidance"}
+DESCRIPTION_PATTERN: re.Pattern[str] = re.compile(
+    r"<([A-Za-z]+)>(.*?)</\1>", re.DOTALL)
+# Host names are used as file names
+FILE_NAME_PATTERN: re.Pattern[str] = re.compile(r"[^A-Za-z0-9._-]")
+
+
+@dataclass
+class Host:
+    host_name: str
+    host_ip: str = ""
+    host_mac: str = ""
+    host_fqdn: str = ""
+    target_comment: str = ""
+    tech_area: str = ""
+    role: str = "None"
+    asset_type: str = "Computing"
+
+    @staticmethod
+    def from_dict(obj: dict[str, Any]) -> 'Host':
+        # Column names are case insensitive, unknown columns are ignored
+        row: dict[str, str] = {str(k).strip().lower(): str(v or "").strip()
+                               for k, v in obj.items() if k is not None}
+        _host_name: str = row.get("host_name", "")
+        if (_host_name == ""):
+            raise Exception("Every host in the inventory needs a host_name.")
+        return Host(_host_name, row.get("host_ip", ""), row.get("host_mac", ""), row.get("host_fqdn", ""),
+                    row.get("target_comment", ""), row.get("tech_area", ""),
+                    row.get("role") or "None", row.get("asset_type") or "Computing")
+
+
+class StigChecklist:
+
+    benchmark: Benchmark
+    xccdf_name: str
+    body: bytes
+
+    def __init__(self, benchmark: Benchmark, preferences: list[Preference], xccdf_name: str) -> None:
+        # The rules are the same on every host, so they are rendered once.
+        # Only the asset and the checklist id change from host to host.
+        self.benchmark = benchmark
+        self.xccdf_name = os.path.basename(xccdf_name)
+        vulns: list[str] = []
+        for p in preferences:
+            group: Optional[Group] = benchmark.get_group(p.id)
+            if (group is not None):
+                vulns.append(self.render_vuln(group=group, preference=p))
+        self.body = ''.join(vulns).encode(ENCODING)
+
+    @staticmethod
+    def read_inventory(path: str) -> Iterator[Host]:
+        # A CSV file with a header, e.g. host_name,host_ip,host_fqdn
+        with open(path, "r", encoding=ENCODING, newline="") as file:
+            reader: csv.DictReader = csv.DictReader(file)
+            if (reader.fieldnames is None or "host_name" not in [f.strip().lower() for f in reader.fieldnames]):
+                raise Exception("Inventory file must have a host_name column.")
+            for row in reader:
+                yield Host.from_dict(row)
+
+    def generate(self, inventory_file: str, output_directory: str) -> int:
+        # Hosts are read and written one at a time, memory does not grow with the inventory
+        with StigMetrics.span("checklist"):
+            checklist_dir: str = os.path.join(output_directory, CHECKLIST_FOLDER)
+            os.makedirs(checklist_dir, exist_ok=True)
+            file_names: set[str] = set()
+            for host in StigChecklist.read_inventory(inventory_file):
+                file_name: str = FILE_NAME_PATTERN.sub(
+                    "_", host.host_name) + CHECKLIST_EXTENSION
+                if (file_name.lower() in file_names):
+                    raise Exception(
+                        f"Host {host.host_name} is listed more than once in the inventory.")
+                file_names.add(file_name.lower())
+                with open(os.path.join(checklist_dir, file_name), "wb") as file:
+                    self.write(host=host, file=file)
+            return len(file_names)
+
+    def write(self, host: Host, file: IO[bytes]) -> None:
+        file.write(self.render_head(host=host).encode(ENCODING))
+        file.write(self.body)
+        file.write(b"\t\t</iSTIG>\n\t</STIGS>\n</CHECKLIST>\n")
+
+    def render_head(self, host: Host) -> str:
+        asset: list[tuple[str, str]] = [
+            ("ROLE", host.role),
+            ("ASSET_TYPE", host.asset_type),
+            ("HOST_NAME", host.host_name),
+            ("HOST_IP", host.host_ip),
+            ("HOST_MAC", host.host_mac),
+            ("HOST_FQDN", host.host_fqdn),
+            ("TARGET_COMMENT", host.target_comment),
+            ("TECH_AREA", host.tech_area),
+            ("TARGET_KEY", ""),
+            ("WEB_OR_DATABASE", "false"),
+            ("WEB_DB_SITE", ""),
+            ("WEB_DB_INSTANCE", "")]
+        info: list[tuple[str, str]] = [
+            ("version", self.benchmark.version),
+            ("classification", "UNCLASSIFIED"),
+            ("customname", ""),
+            ("stigid", self.benchmark.id),
+            ("description", self.benchmark.description),
+            ("filename", self.xccdf_name),
+            ("releaseinfo", self.__get_release_info()),
+            ("title", self.benchmark.title),
+            ("uuid", str(uuid.uuid4())),
+            ("notice", "terms-of-use"),
+            ("source", "STIG.DOD.MIL")]
+        return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<CHECKLIST>\n\t<ASSET>\n"
+                + ''.join(f"\t\t<{k}>{escape(v)}</{k}>\n" for k, v in asset)
+                + "\t</ASSET>\n\t<STIGS>\n\t\t<iSTIG>\n\t\t\t<STIG_INFO>\n"
+                + ''.join(f"\t\t\t\t<SI_DATA>\n\t\t\t\t\t<SID_NAME>{k}</SID_NAME>\n\t\t\t\t\t<SID_DATA>{escape(v)}</SID_DATA>\n\t\t\t\t</SI_DATA>\n"
+                          for k, v in info)
+                + "\t\t\t</STIG_INFO>\n")
+
+    def render_vuln(self, group: Group, preference: Preference) -> str:
+        sections: dict[str, str] = {m.group(1): m.group(2) for m in DESCRIPTION_PATTERN.finditer(
+            str(group.Rule.description))}
+        data: list[tuple[str, str]] = [
+            ("Vuln_Num", group.id),
+            ("Severity", group.Rule.severity),
+            ("Group_Title", group.title),
+            ("Rule_ID", group.Rule.id),
+            ("Rule_Ver", group.Rule.version),
+            ("Rule_Title", group.Rule.title)]
+        data += [(k, sections.get(t, "")) for k, t in DESCRIPTION_TAGS.items()]
+        data += [
+            ("Check_Content", group.Rule.check.check_content),
+            ("Fix_Text", group.Rule.fixtext.text),
+            ("Weight", group.Rule.weight),
+            ("Class", "Unclass"),
+            ("STIGRef", f"{self.benchmark.title} :: Version {self.benchmark.version}, {self.__get_release_info()}")]
+
+        # Rejected rules are closed with the rationale, the others are left for the assessor
+        status: str = NOT_REVIEWED
+        comments: str = ""
+        if (preference.applicable is False):
+            status = NOT_APPLICABLE
+            comments = preference.rationale or ""
+        return ("\t\t\t<VULN>\n"
+                + ''.join(f"\t\t\t\t<STIG_DATA>\n\t\t\t\t\t<VULN_ATTRIBUTE>{k}</VULN_ATTRIBUTE>\n\t\t\t\t\t<ATTRIBUTE_DATA>{escape(v)}</ATTRIBUTE_DATA>\n\t\t\t\t</STIG_DATA>\n"
+                          for k, v in data)
+                + f"\t\t\t\t<STATUS>{status}</STATUS>\n"
+                + "\t\t\t\t<FINDING_DETAILS></FINDING_DETAILS>\n"
+                + f"\t\t\t\t<COMMENTS>{escape(comments)}</COMMENTS>\n"
+                + "\t\t\t\t<SEVERITY_OVERRIDE></SEVERITY_OVERRIDE>\n"
+                + "\t\t\t\t<SEVERITY_JUSTIFICATION></SEVERITY_JUSTIFICATION>\n"
+                + "\t\t\t</VULN>\n")
+
+    def __get_release_info(self) -> str:
+        return next((p.text for p in self.benchmark.plain_text if p.id == "release-info"), "")
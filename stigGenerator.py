@@ -1,157 +1,41 @@
+import codecs
+import io
 import os
 import re
 import stat
-import sys
 import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
-from colorama import Fore, Style
-
-from stigOs import StigOs
-from stigParser import Benchmark, Group, Preference, Profile, Select
-from stigZip import StigZip
-
-CHECKPOINT_FILE: str = os.path.join(os.path.dirname(
-    os.path.realpath(__file__)), "checkpoint.tmp")
+from stigMetrics import StigMetrics
+from stigParser import (Benchmark, Group, Preference, Profile, Select,
+                        StigParser)
+from stigZip import StigArchive
 
 ENCODING: str = "UTF-8"
 
+DEFAULT_TITLE: str = "Custom title"
+DEFAULT_DESCRIPTION: str = "Custom description"
 
-class StigGenerator:
+# The custom profile is spliced in front of the first profile of the original
+# XCCDF, as long as the document is plain enough to do it without parsing.
+PROFILE_PATTERN: re.Pattern[bytes] = re.compile(rb"<Profile[\s/>]")
+BENCHMARK_PATTERN: re.Pattern[bytes] = re.compile(rb"<Benchmark[\s>][^>]*>")
+XCCDF_NAMESPACE_PATTERN: re.Pattern[bytes] = re.compile(
+    rb"""\sxmlns\s*=\s*["']http://checklists\.nist\.gov/xccdf/1\.1["']""")
+DECLARED_ENCODING_PATTERN: re.Pattern[bytes] = re.compile(
+    rb"""^<\?xml[^>]*\sencoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
 
-    @staticmethod
-    def prompt_profile(benchmark: Benchmark) -> Profile:
-
-        if (os.path.exists(CHECKPOINT_FILE)):
-            with open(CHECKPOINT_FILE, "a+", encoding=ENCODING) as file:
-                file.seek(0)
-                text: str = file.read()
-                match: Optional[re.Match[str]] = re.search(
-                    "profile:([0-9]+)", text)  # type: ignore
-                if match:
-                    selected: int = int(match.group(1))
-                    return benchmark.Profile[selected]
-
-                raise Exception(
-                    "Invalid checkpoint file. Please remove the file and restart.")
-        else:
-            StigGenerator.__clear_console()
-            print(f"{Fore.GREEN}Please select a profile below:{Style.RESET_ALL}\n")
-            opt: int = 1
-            for profile in benchmark.Profile:
-                print(f"[{opt}] {profile.title}")
-                opt += 1
 
-            selected = int(
-                input(f"\n{Fore.GREEN}Selection: {Style.RESET_ALL}")) - 1
-
-            # Save as checkpoint
-            with open(CHECKPOINT_FILE, "a+", encoding=ENCODING) as file:
-                file.write(f"profile:{selected}\nlast:0\n")
-                os.chmod(CHECKPOINT_FILE, stat.S_IWRITE |
-                         stat.S_IWGRP | stat.S_IROTH)
-
-            return benchmark.Profile[selected]
+class StigGenerator:
 
     @staticmethod
     def filter_groups(benchmark: Benchmark, selected_profile: Profile) -> list[Group]:
-        rules: list[Group] = []
-        for s in selected_profile.select:
-            for g in benchmark.Group:
-                if (g.id == s.idref):
-                    rules.append(g)
-                    break
-        return rules
+        with StigMetrics.span("filter"):
+            return benchmark.get_selected_groups(profile=selected_profile)
 
     @staticmethod
-    def prompt_preferences(selected_groups: list[Group]) -> list[Preference]:
-        scan_preferences: list[Preference] = []
-
-        start: int = 0
-        if (os.path.exists(CHECKPOINT_FILE)):
-            with open(CHECKPOINT_FILE, "a+", encoding=ENCODING) as file:
-                file.seek(0)
-                text: str = file.read()
-
-                match: Optional[re.Match[str]] = re.search(
-                    "last:([0-9]+)", text)
-                if (match):
-                    # Start after last saved answer, except it is already the beginning.
-                    last: int = int(match.group(1))
-                    if (last != 0):
-                        start = last + 1
-                else:
-                    raise Exception(
-                        "Invalid checkpoint file. Please remove the file and restart.")
-
-        for i in range(start, len(selected_groups), 1):
-            group: Group = selected_groups[i]
-            preference: Preference = None  # type: ignore
-
-            StigGenerator.__clear_console()
-            print(
-                f"{Fore.YELLOW}Title:{Style.RESET_ALL} {group.Rule.title}\n(severity: {Fore.RED}{group.Rule.severity}{Style.RESET_ALL}, weight: {Fore.RED}{group.Rule.weight}{Style.RESET_ALL})")
-
-            # Fix new lines
-            desc: str = group.Rule.description.replace("\\\\n", "\n")
-            # Get rid of leftover XML tags
-            desc = re.sub("</?[A-Za-z]+>", "", desc)
-            print(
-                f"\n{Fore.YELLOW}Description:{Style.RESET_ALL}\n{desc}")
-
-            # Fix new lines
-            mitigation: str = group.Rule.fixtext.text.replace("\\\\n", "\n")
-            # Format code
-            mitigation = re.sub(
-                r"(\$.+)", fr"{Fore.GREEN}\1{Style.RESET_ALL}", mitigation)
-            print(f"\n{Fore.YELLOW}Mitigation:{Style.RESET_ALL}\n{mitigation}")
-
-            # Fix new lines
-            control: str = group.Rule.check.check_content.replace(
-                "\\\\n", "\n")
-            # Format code
-            control = re.sub(
-                r"(\$.+)", fr"{Fore.GREEN}\1{Style.RESET_ALL}", control)
-            print(
-                f"\n{Fore.YELLOW}Control:{Style.RESET_ALL}\n{control}")
-
-            invalid: bool = True
-            prompt: str = ""
-            while (invalid):
-                size: int = os.get_terminal_size().columns
-                line: str = ''.join(["*" for i in range(size)])
-                prompt = input(
-                    f"\n{line}\nDo you accept this rule for scan? ({i + 1}/{len(selected_groups)}) [Y/n]: ")
-                if (prompt.capitalize() == "Y" or prompt.capitalize() == "N" or prompt == ""):
-                    invalid = False
-
-            if (prompt.capitalize() == "N"):
-                invalid = True  # Do not accept empty description
-                while (invalid):
-                    rationale: str = input(
-                        "Provide rationale on why you do not want to implement this measure (at least 3 chars): ")
-                    if (len(rationale) >= 3):
-                        preference = Preference(
-                            id=group.id, rule=group.Rule.title, applicable=False, rationale=rationale)
-                        invalid = False
-            else:
-                preference = Preference(
-                    id=group.id, rule=group.Rule.title, applicable=True, rationale="")
-
-            scan_preferences.append(preference)
-
-            # Save as checkpoint
-            with open(CHECKPOINT_FILE, "a+", encoding=ENCODING) as file:
-                file.seek(0)
-                content: str = file.read()
-                content = re.sub(r"last:([0-9]+)", f"last:{i}", content)
-                file.truncate(0)
-                file.write(content)
-
-        return scan_preferences
-
-    @staticmethod
-    def get_custom_profile(preferences: list[Preference]) -> Profile:
+    def build_custom_profile(preferences: list[Preference], title: str = "", description: str = "") -> Profile:
         selected: list[Select] = []
 
         accepted: list[Preference] = [
@@ -160,35 +44,78 @@ class StigGenerator:
             s: Select = Select(idref=a.id, selected="true")
             selected.append(s)
 
-        custom_title: str = input("Title for you profile [Custom title]: ")
+        custom_title: str = title
         if (custom_title == ""):
-            custom_title = "Custom title"
-        custom_description: str = input(
-            "Description for your profile [Custom description]: ")
+            custom_title = DEFAULT_TITLE
+        custom_description: str = description
         if (custom_description == ""):
-            custom_description = "Custom description"
+            custom_description = DEFAULT_DESCRIPTION
         custom_id: str = custom_title.replace(" ", "_").replace("-", "_")
         custom_profile: Profile = Profile(
             title=custom_title, description=custom_description, select=selected, id=custom_id)
         return custom_profile
 
     @staticmethod
-    def generate(stig_file: str, output_dir: str, benchmark: Benchmark, preferences: list[Preference], custom_profile: Profile) -> None:
-        StigGenerator.__generate_profile(
-            custom_profile=custom_profile, stig_file=stig_file, output_directory=output_dir, benchmarkId=benchmark.id)
-        StigGenerator.__generate_rationale(
-            custom_profile=custom_profile, preferences=preferences, output_directory=output_dir)
-        StigGenerator.__cleanup()
+    def get_denylist(preferences: list[Preference]) -> list[str]:
+        return [p.id for p in preferences if p.applicable is False]
+
+    @staticmethod
+    def load_benchmark(archive: StigArchive, cache_dir: Optional[str] = None) -> Benchmark:
+        with StigMetrics.span("parse"):
+            if (cache_dir):
+                from stigCache import StigCache
+                return StigCache(cache_dir).load_or_parse(archive=archive)
+            return StigParser.parse_archive(archive=archive).Benchmark
+
+    @staticmethod
+    def export(stig_archive: StigArchive, output_dir: str, benchmark: Benchmark, preferences: list[Preference], custom_profile: Profile, ansible_file: Optional[str] = None, stream_ansible: bool = False) -> None:
+        # The STIG zip and the Ansible tasks only share the denylist, so they are
+        # generated side by side in two threads. Only zlib and file I/O release
+        # the GIL, the YAML filtering of the Ansible tasks does not, so the
+        # overlap is limited to the zip side. The export span gets the memory
+        # and CPU time of both threads.
+        with StigMetrics.span("export"):
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="StigExport") as executor:
+                futures: list[Future[None]] = [executor.submit(
+                    StigMetrics.untraced(StigGenerator.__export_profile), stig_archive, output_dir, preferences, custom_profile)]
+                if (ansible_file):
+                    futures.append(executor.submit(StigMetrics.untraced(StigGenerator.__generate_ansible), ansible_file, output_dir,
+                                                   StigGenerator.get_denylist(preferences), stream_ansible))
+                for future in futures:
+                    future.result()
+
+    @staticmethod
+    def write_checklists(stig_archive: StigArchive, benchmark: Benchmark, preferences: list[Preference], inventory_file: str, output_dir: str) -> int:
+        from stigChecklist import StigChecklist
+        checklist: StigChecklist = StigChecklist(
+            benchmark=benchmark, preferences=preferences, xccdf_name=stig_archive.xccdf_name)
+        return checklist.generate(inventory_file=inventory_file, output_directory=output_dir)
+
+    @staticmethod
+    def __export_profile(stig_archive: StigArchive, output_dir: str, preferences: list[Preference], custom_profile: Profile) -> None:
+        # Writes the outputs without touching the interactive checkpoint
+        with StigMetrics.span("generate_profile"):
+            StigGenerator.__generate_profile(
+                custom_profile=custom_profile, stig_archive=stig_archive, output_directory=output_dir)
+        with StigMetrics.span("generate_rationale"):
+            StigGenerator.__generate_rationale(
+                custom_profile=custom_profile, preferences=preferences, output_directory=output_dir)
+
+    @staticmethod
+    def __generate_ansible(ansible_file: str, output_dir: str, denylist: list[str], stream_ansible: bool) -> None:
+        # ruamel.yaml is only loaded when there are Ansible tasks to filter
+        from stigAnsible import StigAnsible
+        script: StigAnsible = StigAnsible(streaming=stream_ansible)
+        script.generate(ansible_zip=ansible_file,
+                        output_directory=output_dir, denylist=denylist)
 
     @staticmethod
-    def __generate_profile(custom_profile: Profile, stig_file: str, output_directory: str, benchmarkId: str) -> None:
-        sanitized_file_name: str = benchmarkId.replace(
-            " ", "_").replace("-", ".")
-        temp_xml_file: str = os.path.join(
-            output_directory, f"{sanitized_file_name}.xml")
-        StigGenerator.__save_modified_zip(
-            custom_profile=custom_profile, zip_file_path=stig_file, output_directory=output_directory, xml_output=temp_xml_file)
-        StigOs.remove_file(temp_xml_file)
+    def __generate_profile(custom_profile: Profile, stig_archive: StigArchive, output_directory: str) -> None:
+        # Everything stays in memory, from the original member to the new zip entry
+        modified_xccdf: bytes = StigGenerator.inject_profile(
+            custom_profile=custom_profile, xccdf=stig_archive.read_xccdf())
+        stig_archive.generate_stig_zip(
+            output_directory=output_directory, modified_xccdf=modified_xccdf)
 
     @staticmethod
     def __generate_rationale(custom_profile: Profile, preferences: list[Preference], output_directory: str) -> None:
@@ -197,10 +124,6 @@ class StigGenerator:
         StigGenerator.__save_rationale_xml(
             profile_name=custom_profile.title, preferences=preferences, output_directory=output_directory)
 
-    @staticmethod
-    def __cleanup() -> None:
-        os.remove(CHECKPOINT_FILE)
-
     @staticmethod
     def __get_profile_index(root: ET.Element) -> int:
         for i in range(len(root)):
@@ -210,27 +133,58 @@ class StigGenerator:
         return -1
 
     @staticmethod
-    def __save_modified_zip(custom_profile: Profile, zip_file_path: str, output_directory: str, xml_output: str) -> None:
-        # Read from zip
-        folder_name, xccdf_file_name = StigZip.extract_xccdf(
-            zip_file_path=zip_file_path, output_directory=output_directory)
-
-        # Create XML
-        xml_input: str = os.path.join(
-            output_directory, f"{folder_name}/{xccdf_file_name}")
-        StigGenerator.__generate_xml_file(
-            custom_profile=custom_profile, original_xml_file=xml_input, generated_xml_file=xml_output)
-
-        # Create new zip
+    def inject_profile(custom_profile: Profile, xccdf: bytes) -> bytes:
+        # Only the new profile is serialized, the rest stays byte-identical
+        spliced: Optional[bytes] = StigGenerator.__splice_profile(
+            custom_profile=custom_profile, xccdf=xccdf)
+        if (spliced is not None):
+            return spliced
+        return StigGenerator.__rewrite_profile(custom_profile=custom_profile, xccdf=xccdf)
+
+    @staticmethod
+    def __splice_profile(custom_profile: Profile, xccdf: bytes) -> Optional[bytes]:
+        if (xccdf.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE))):
+            return None
+        match: Optional[re.Match[bytes]] = PROFILE_PATTERN.search(xccdf)
+        if (match is None):
+            return None
+        offset: int = match.start()
+        head: bytes = xccdf[:offset]
+
+        # A Profile tag in a comment or CDATA section is not the real one
+        if (b"<!--" in head or b"<![CDATA[" in head):
+            return None
+        declared: Optional[re.Match[bytes]] = DECLARED_ENCODING_PATTERN.match(
+            head.removeprefix(codecs.BOM_UTF8))
+        if (declared and declared.group(1).lower() not in (b"utf-8", b"utf8")):
+            return None
+        # Unprefixed elements must land in the XCCDF namespace
+        benchmark: Optional[re.Match[bytes]] = BENCHMARK_PATTERN.search(head)
+        if (benchmark is None or XCCDF_NAMESPACE_PATTERN.search(benchmark.group(0)) is None):
+            return None
+
+        # Follow the layout of the original profile: on its own line with the
+        # same indentation and line ending, or inline in a single line document
+        line_start: int = head.rfind(b"\n") + 1
+        indent: bytes = head[line_start:]
+        newline: bytes = b""
+        if (line_start > 0 and indent.strip(b" \t") == b""):
+            newline = b"\r\n" if head[:line_start].endswith(b"\r\n") else b"\n"
+        else:
+            indent = b""
 
-        StigZip.generate_stig_zip(zip_file_path=zip_file_path, output_directory=output_directory,
-                                  folder_in_zip=folder_name, xccdf_file_in_zip=xccdf_file_name, modified_xccdf=xml_output)
+        custom_profile_xml: ET.Element = StigGenerator.__generate_profile_xml(
+            custom_profile=custom_profile)
+        if (newline):
+            ET.indent(custom_profile_xml, space=indent.decode(ENCODING), level=1)
+        profile_xml: str = ET.tostring(custom_profile_xml, encoding="unicode")
+        if (newline == b"\r\n"):
+            profile_xml = profile_xml.replace("\n", "\r\n")
 
-        # Cleanup
-        StigOs.remove_dir(os.path.join(output_directory, folder_name))
+        return head + profile_xml.encode(ENCODING) + newline + indent + xccdf[offset:]
 
     @staticmethod
-    def __generate_xml_file(custom_profile: Profile, original_xml_file: str, generated_xml_file: str) -> None:
+    def __rewrite_profile(custom_profile: Profile, xccdf: bytes) -> bytes:
         # DevSkim: ignore DS137138
         ET.register_namespace('', 'http://checklists.nist.gov/xccdf/1.1')
         # DevSkim: ignore DS137138
@@ -246,15 +200,15 @@ class StigGenerator:
 
         custom_profile_xml: ET.Element = StigGenerator.__generate_profile_xml(
             custom_profile=custom_profile)
-        tree: ET.ElementTree = ET.parse(original_xml_file)
+        tree: ET.ElementTree = ET.parse(io.BytesIO(xccdf))
         root: ET.Element = tree.getroot()
         index: int = StigGenerator.__get_profile_index(root=root)
         root.insert(index, custom_profile_xml)
         ET.indent(tree)
 
-        tree.write(generated_xml_file)
-        os.chmod(generated_xml_file, stat.S_IWRITE |
-                 stat.S_IWGRP | stat.S_IROTH)
+        buffer: io.BytesIO = io.BytesIO()
+        tree.write(buffer)
+        return buffer.getvalue()
 
     @staticmethod
     def __save_rationale_xml(profile_name: str, preferences: list[Preference], output_directory: str) -> None:
@@ -277,7 +231,9 @@ class StigGenerator:
             ET.indent(tree=root)
             xml_as_str: str = ET.tostring(root, "unicode")
             file.write(xml_as_str)
-            os.chmod(rationale_output, stat.S_IWRITE |
+            # Upgrade mode reads the file of the previous run, so the owner
+            # needs read access on top of the original mode
+            os.chmod(rationale_output, stat.S_IREAD | stat.S_IWRITE |
                      stat.S_IWGRP | stat.S_IROTH)
 
     @staticmethod
@@ -295,20 +251,4 @@ class StigGenerator:
             attr["selected"] = s.selected
             sel: ET.Element = ET.Element("select", attr)
             p.append(sel)
-        ET.indent(p)
         return p
-
-    @staticmethod
-    def __clear_console() -> None:
-        if (sys.platform == "win32"):
-            _: int = StigGenerator.__clear_win32()
-        else:
-            _: int = StigGenerator.__clear_unix()
-
-    @staticmethod
-    def __clear_unix() -> int:
-        return os.system(command='clear')
-
-    @staticmethod
-    def __clear_win32() -> int:
-        return os.system(command='cls')
@@ -0,0 +1,126 @@
+import re
+from collections import deque
+from typing import Iterable, Optional
+
+from stigParser import Group, Rule
+
+WORD_PATTERN: re.Pattern[str] = re.compile(r"[a-z0-9]+")
+TAG_PATTERN: re.Pattern[str] = re.compile(r"</?[A-Za-z]+>")
+RULE_ID_PATTERN: re.Pattern[str] = re.compile(r"^(sv-[0-9]+)r[0-9]+_rule$")
+# Parentheses, quoted phrases and anything else up to the next space
+QUERY_TOKEN_PATTERN: re.Pattern[str] = re.compile(r'[()]|[^\s()"]*"[^"]*"?|[^\s()]+')
+
+AND: str = "AND"
+OR: str = "OR"
+NOT: str = "NOT"
+
+SEVERITY_FIELD: str = "severity"
+ID_FIELD: str = "id"
+
+
+class StigIndex:
+
+    groups: list[Group]
+
+    def __init__(self, groups: Optional[Iterable[Group]] = None) -> None:
+        self.groups = []
+        self.__words: dict[str, set[int]] = {}
+        self.__fields: dict[str, dict[str, set[int]]] = {
+            SEVERITY_FIELD: {}, ID_FIELD: {}}
+        if (groups is not None):
+            self.add(groups)
+
+    def add(self, groups: Iterable[Group]) -> None:
+        # Groups of several benchmarks can share one index
+        for group in groups:
+            position: int = len(self.groups)
+            self.groups.append(group)
+            rule: Rule = group.Rule
+            text: str = " ".join((group.id, rule.id, rule.version, rule.title, rule.description,
+                                  rule.fixtext.text, rule.check.check_content))
+            for word in set(StigIndex.tokenize(text)):
+                self.__words.setdefault(word, set()).add(position)
+
+            self.__add_field(SEVERITY_FIELD, rule.severity, position)
+            for id in StigIndex.__get_ids(group):
+                self.__add_field(ID_FIELD, id, position)
+
+    def search(self, query: str) -> list[Group]:
+        return [self.groups[p] for p in self.find(query)]
+
+    def find(self, query: str) -> list[int]:
+        # Words and field:value terms combined with AND, OR, NOT and parentheses.
+        # Adjacent terms are combined with AND, e.g. "severity:low FIPS".
+        tokens: deque[str] = deque(QUERY_TOKEN_PATTERN.findall(query))
+        if (len(tokens) == 0):
+            return []
+        result: set[int] = self.__parse_or(tokens)
+        if (len(tokens) > 0):
+            raise Exception(f"Unexpected \"{tokens[0]}\" in query.")
+        return sorted(result)
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        text = TAG_PATTERN.sub(" ", text.replace("\\\\n", " "))
+        return WORD_PATTERN.findall(text.lower())
+
+    def __add_field(self, field: str, value: str, position: int) -> None:
+        self.__fields[field].setdefault(value.lower(), set()).add(position)
+
+    @staticmethod
+    def __get_ids(group: Group) -> list[str]:
+        # V-230000, SV-230000r627750_rule, SV-230000 and the STIG id, e.g. RHEL-08-010000
+        ids: list[str] = [group.id, group.Rule.id, group.Rule.version]
+        match: Optional[re.Match[str]] = RULE_ID_PATTERN.match(
+            group.Rule.id.lower())
+        if (match):
+            ids.append(match.group(1))
+        return ids
+
+    def __parse_or(self, tokens: deque[str]) -> set[int]:
+        result: set[int] = self.__parse_and(tokens)
+        while (len(tokens) > 0 and tokens[0] == OR):
+            tokens.popleft()
+            result = result | self.__parse_and(tokens)
+        return result
+
+    def __parse_and(self, tokens: deque[str]) -> set[int]:
+        result: set[int] = self.__parse_not(tokens)
+        while (len(tokens) > 0 and tokens[0] not in (OR, ")")):
+            if (tokens[0] == AND):
+                tokens.popleft()
+            result = result & self.__parse_not(tokens)
+        return result
+
+    def __parse_not(self, tokens: deque[str]) -> set[int]:
+        if (len(tokens) > 0 and tokens[0] == NOT):
+            tokens.popleft()
+            return set(range(len(self.groups))) - self.__parse_not(tokens)
+        return self.__parse_term(tokens)
+
+    def __parse_term(self, tokens: deque[str]) -> set[int]:
+        if (len(tokens) == 0):
+            raise Exception("Unexpected end of query.")
+        token: str = tokens.popleft()
+        if (token == "("):
+            result: set[int] = self.__parse_or(tokens)
+            if (len(tokens) == 0 or tokens.popleft() != ")"):
+                raise Exception("Missing \")\" in query.")
+            return result
+        if (token in (")", AND, OR)):
+            raise Exception(f"Unexpected \"{token}\" in query.")
+        return self.__match(token)
+
+    def __match(self, term: str) -> set[int]:
+        field, separator, value = term.partition(":")
+        if (separator and field.lower() in self.__fields):
+            return set(self.__fields[field.lower()].get(value.strip('"').lower(), set()))
+
+        # A phrase or a term such as "FIPS 140-2" matches rules having all its words
+        words: list[str] = StigIndex.tokenize(term)
+        if (len(words) == 0):
+            return set()
+        result: set[int] = set(self.__words.get(words[0], set()))
+        for word in words[1:]:
+            result &= self.__words.get(word, set())
+        return result
@@ -0,0 +1,106 @@
+import json
+import os
+import stat
+from typing import IO, Any, Optional
+
+from stigParser import Preference
+
+ENCODING: str = "utf-8"
+
+# Answers are flushed to the OS right away, but only synced to disk in batches
+SYNC_INTERVAL: int = 10
+
+
+class StigJournal:
+
+    path: str
+    sync_interval: int
+    profile: Optional[int]
+    preferences: dict[str, Preference]
+
+    def __init__(self, path: str, sync_interval: int = SYNC_INTERVAL) -> None:
+        self.path = path
+        self.sync_interval = sync_interval
+        self.profile = None
+        self.preferences = {}
+        self.__file: Optional[IO[str]] = None
+        self.__unsynced: int = 0
+
+    def __enter__(self) -> 'StigJournal':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def replay(self) -> None:
+        # One pass over the journal, the last answer for a rule wins
+        if (self.exists() is False):
+            return
+        with open(self.path, "r", encoding=ENCODING) as file:
+            for line in file:
+                # Every record ends with a newline, a line without one is a
+                # torn write of the last record before a crash
+                if (line.endswith("\n") is False):
+                    break
+                line = line.strip()
+                try:
+                    if (line.startswith("profile:")):
+                        self.profile = int(line.removeprefix("profile:"))
+                    elif (line.startswith("{")):
+                        preference: Preference = Preference.from_dict(
+                            json.loads(line))
+                        self.preferences[preference.id] = preference
+                except ValueError:
+                    continue  # Not a record, e.g. edited by hand
+
+    def record_profile(self, index: int) -> None:
+        self.profile = index
+        self.__append(f"profile:{index}")
+        self.sync()
+
+    def record(self, preference: Preference) -> None:
+        self.preferences[preference.id] = preference
+        self.__append(json.dumps({"id": preference.id, "rule": preference.rule,
+                                  "applicable": preference.applicable, "rationale": preference.rationale}))
+        self.__unsynced += 1
+        if (self.__unsynced >= self.sync_interval):
+            self.sync()
+
+    def sync(self) -> None:
+        if (self.__file is not None):
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+        self.__unsynced = 0
+
+    def close(self) -> None:
+        if (self.__file is not None):
+            self.sync()
+            self.__file.close()
+            self.__file = None
+
+    def remove(self) -> None:
+        self.close()
+        if (self.exists()):
+            os.remove(self.path)
+
+    def __append(self, line: str) -> None:
+        if (self.__file is None):
+            self.__drop_torn_write()
+            fd: int = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                              stat.S_IREAD | stat.S_IWRITE)
+            self.__file = os.fdopen(fd, "a", encoding=ENCODING)
+        self.__file.write(f"{line}\n")
+        self.__file.flush()
+
+    def __drop_torn_write(self) -> None:
+        # Cut the unfinished last line, so that new records neither extend it
+        # nor make it look complete. The journal has one short line per rule.
+        if (self.exists() is False):
+            return
+        with open(self.path, "rb") as file:
+            content: bytes = file.read()
+        if (len(content) > 0 and content.endswith(b"\n") is False):
+            os.truncate(self.path, content.rfind(b"\n") + 1)
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+ENCODING: str = "utf-8"
+
+METRICS_FILE: str = "metrics.json"
+
+
+@dataclass
+class Span:
+    name: str
+    wall_time: float
+    cpu_time: float
+    start_memory: Optional[int] = None
+    peak_memory: Optional[int] = None
+    thread: str = ""
+
+
+@dataclass
+class Frame:
+    # An open span: the highest memory peak of its children, and the CPU time
+    # of the worker threads started in it
+    peak_memory: int = 0
+    worker_cpu_time: float = 0.0
+
+
+class StigMetrics:
+
+    # Spans are only measured when metrics are enabled or a hook is registered
+    enabled: bool = False
+    spans: list[Span] = []
+    hooks: list[Callable[[Span], None]] = []
+    __local: threading.local = threading.local()
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def enable(trace_memory: bool = True) -> None:
+        StigMetrics.enabled = True
+        if (trace_memory and tracemalloc.is_tracing() is False):
+            tracemalloc.start()
+
+    @staticmethod
+    def disable() -> None:
+        StigMetrics.enabled = False
+        if (tracemalloc.is_tracing()):
+            tracemalloc.stop()
+
+    @staticmethod
+    def reset() -> None:
+        with StigMetrics.__lock:
+            StigMetrics.spans = []
+
+    @staticmethod
+    def add_hook(hook: Callable[[Span], None]) -> None:
+        StigMetrics.hooks.append(hook)
+
+    @staticmethod
+    def remove_hook(hook: Callable[[Span], None]) -> None:
+        StigMetrics.hooks.remove(hook)
+
+    @staticmethod
+    def span(name: str) -> ContextManager[None]:
+        if (StigMetrics.enabled is False and len(StigMetrics.hooks) == 0):
+            return nullcontext()
+        return StigMetrics.__measure(name)
+
+    @staticmethod
+    def untraced(func: Callable[..., Any]) -> Callable[..., Any]:
+        # For stages running side by side in threads. tracemalloc has one peak
+        # for the process, so their spans only get times, and the memory peak
+        # goes to the span around them. So does their CPU time, which the
+        # thread_time of the span itself does not see.
+        stack: list[Frame] = StigMetrics.__get_stack()
+        parent: Optional[Frame] = stack[-1] if len(stack) > 0 else None
+
+        def run(*args: Any) -> Any:
+            StigMetrics.__local.untraced = True
+            start_cpu: float = time.thread_time()
+            try:
+                return func(*args)
+            finally:
+                StigMetrics.__local.untraced = False
+                if (parent is not None):
+                    with StigMetrics.__lock:
+                        parent.worker_cpu_time += time.thread_time() - start_cpu
+        return run
+
+    @staticmethod
+    def report() -> dict[str, Any]:
+        with StigMetrics.__lock:
+            return {"spans": [asdict(s) for s in StigMetrics.spans]}
+
+    @staticmethod
+    def save(path: str) -> None:
+        with open(path, "w", encoding=ENCODING) as file:
+            json.dump(StigMetrics.report(), file, indent=4)
+
+    @staticmethod
+    @contextmanager
+    def __measure(name: str) -> Iterator[None]:
+        # Nested spans reset the tracemalloc peak, so every open span keeps the
+        # highest peak seen by its children. Threads share one tracemalloc peak.
+        tracing: bool = tracemalloc.is_tracing() and getattr(
+            StigMetrics.__local, "untraced", False) is False
+        stack: list[Frame] = StigMetrics.__get_stack()
+        start_memory: Optional[int] = None
+        if (tracing):
+            start_memory, peak = tracemalloc.get_traced_memory()
+            if (len(stack) > 0):
+                stack[-1].peak_memory = max(stack[-1].peak_memory, peak)
+            tracemalloc.reset_peak()
+        frame: Frame = Frame()
+        stack.append(frame)
+
+        start_wall: float = time.perf_counter()
+        start_cpu: float = time.thread_time()
+        try:
+            yield
+        finally:
+            wall_time: float = time.perf_counter() - start_wall
+            stack.pop()
+            with StigMetrics.__lock:
+                cpu_time: float = time.thread_time() - start_cpu + frame.worker_cpu_time
+
+            peak_memory: Optional[int] = None
+            if (tracing and tracemalloc.is_tracing()):
+                peak_memory = max(frame.peak_memory, tracemalloc.get_traced_memory()[1])
+                if (len(stack) > 0):
+                    stack[-1].peak_memory = max(stack[-1].peak_memory, peak_memory)
+
+            span: Span = Span(name, wall_time, cpu_time, start_memory,
+                              peak_memory, threading.current_thread().name)
+            if (StigMetrics.enabled):
+                with StigMetrics.__lock:
+                    StigMetrics.spans.append(span)
+            for hook in list(StigMetrics.hooks):
+                hook(span)
+
+    @staticmethod
+    def __get_stack() -> list[Frame]:
+        stack: Optional[list[Frame]] = getattr(
+            StigMetrics.__local, "stack", None)
+        if (stack is None):
+            stack = []
+            StigMetrics.__local.stack = stack
+        return stack
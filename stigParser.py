@@ -1,14 +1,40 @@
-from dataclasses import dataclass
-from typing import Any, List, Optional, OrderedDict
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import IO, Any, List, Optional
 
-import xmltodict
-
-from stigZip import StigZip
+from stigZip import StigArchive, StigZip
 
 ENCODING: str = "utf-8"
 
 
-@dataclass
+def _local_name(tag: str) -> str:
+    # Strip the namespace, e.g. {http://checklists.nist.gov/xccdf/1.1}Group
+    return tag.rsplit("}", 1)[-1]
+
+
+def _children(elem: ET.Element) -> dict[str, ET.Element]:
+    # First child wins for repeated tags, like the first item of an xmltodict list
+    children: dict[str, ET.Element] = {}
+    for child in elem:
+        children.setdefault(_local_name(child.tag), child)
+    return children
+
+
+def _intern(value: Any) -> str:
+    # Severity, weight, selected and the ids repeated in every profile are
+    # shared between instances instead of being stored as separate copies.
+    return sys.intern(str(value))
+
+
+def _element_text(elem: Optional[ET.Element]) -> str:
+    # Mimic xmltodict: whitespace is stripped and empty text becomes None
+    if (elem is None or elem.text is None):
+        return str(None)
+    return str(elem.text.strip() or None)
+
+
+@dataclass(slots=True)
 class Benchmark:
     Group: List['Group']
     Profile: List['Profile']
@@ -18,6 +44,39 @@ class Benchmark:
     title: str
     version: str
     id: str
+    group_index: dict[str, 'GroupType'] = field(
+        init=False, repr=False, compare=False)
+    profile_groups: dict[str, list['GroupType']] = field(
+        init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.group_index = {g.id: g for g in self.Group}
+        self.profile_groups = {}
+        for p in self.Profile:
+            self.profile_groups[p.id] = self.__select_groups(p)
+
+    def get_group(self, id: str) -> Optional['GroupType']:
+        # Accept both "V-230000" and the bare number used by Ansible tasks
+        if (id.isdigit()):
+            id = f"V-{id}"
+        return self.group_index.get(id)
+
+    def has_group(self, id: str) -> bool:
+        return self.get_group(id) is not None
+
+    def get_selected_groups(self, profile: 'ProfileType') -> list['GroupType']:
+        groups: Optional[list['GroupType']] = self.profile_groups.get(profile.id)
+        if (groups is None):  # Profiles created later, e.g. the custom profile
+            groups = self.__select_groups(profile)
+        return list(groups)
+
+    def __select_groups(self, profile: 'ProfileType') -> list['GroupType']:
+        groups: list['GroupType'] = []
+        for s in profile.select:
+            g: Optional['GroupType'] = self.group_index.get(s.idref)
+            if (g is not None):
+                groups.append(g)
+        return groups
 
     @staticmethod
     def from_dict(obj: Any) -> 'Benchmark':
@@ -33,8 +92,56 @@ class Benchmark:
         _id: str = str(obj.get("@id"))
         return Benchmark(_Group, _Profile, _description, _plain_text, _status, _title, _version, _id)
 
+    @staticmethod
+    def from_stream(stream: IO[bytes]) -> 'Benchmark':
+        # Build the model while reading, and drop every top level element once consumed.
+        _Group: list[Group] = []
+        _Profile: list[Profile] = []
+        _plain_text: list[PlainText] = []
+        _status: Status = Status(str(None), str(None))
+        _description: str = str(None)
+        _title: str = str(None)
+        _version: str = str(None)
+        _id: str = str(None)
+
+        root: Optional[ET.Element] = None
+        depth: int = 0
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if (event == "start"):
+                depth += 1
+                if (root is None):
+                    root = elem
+                    _id = str(elem.get("id"))
+                continue
+
+            depth -= 1
+            if (depth != 1 or root is None):
+                continue
+
+            name: str = _local_name(elem.tag)
+            if (name == "Group"):
+                _Group.append(Group.from_element(elem))
+            elif (name == "Profile"):
+                _Profile.append(Profile.from_element(elem))
+            elif (name == "plain-text"):
+                _plain_text.append(PlainText.from_element(elem))
+            elif (name == "status"):
+                _status = Status.from_element(elem)
+            elif (name == "description"):
+                _description = _element_text(elem)
+            elif (name == "title"):
+                _title = _element_text(elem)
+            elif (name == "version"):
+                _version = _element_text(elem)
+            root.remove(elem)
+
+        if (root is None or _local_name(root.tag) != "Benchmark"):
+            raise Exception("Invalid XCCDF file.")
 
-@ dataclass
+        return Benchmark(_Group, _Profile, _description, _plain_text, _status, _title, _version, _id)
+
+
+@ dataclass(slots=True)
 class Check:
     check_content: str
 
@@ -43,18 +150,28 @@ class Check:
         _check_content: str = str(obj.get("check-content"))
         return Check(_check_content)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Check':
+        _check_content: str = _element_text(_children(elem).get("check-content"))
+        return Check(_check_content)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Fix:
     id: str
 
     @ staticmethod
     def from_dict(obj: Any) -> 'Fix':
-        _id: str = str(obj.get("@id"))
+        _id: str = _intern(obj.get("@id"))
         return Fix(_id)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Fix':
+        _id: str = _intern(elem.get("id"))
+        return Fix(_id)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Fixtext:
     text: str
     fixref: str
@@ -62,11 +179,17 @@ class Fixtext:
     @ staticmethod
     def from_dict(obj: Any) -> 'Fixtext':
         _text: str = str(obj.get("#text"))
-        _fixref: str = str(obj.get("@fixref"))
+        _fixref: str = _intern(obj.get("@fixref"))
         return Fixtext(_text, _fixref)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Fixtext':
+        _text: str = _element_text(elem)
+        _fixref: str = _intern(elem.get("fixref"))
+        return Fixtext(_text, _fixref)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Group:
     id: str
     Rule: 'Rule'
@@ -75,14 +198,23 @@ class Group:
 
     @ staticmethod
     def from_dict(obj: Any) -> 'Group':
-        _id: str = str(obj.get("@id"))
+        _id: str = _intern(obj.get("@id"))
         _Rule: Rule = Rule.from_dict(obj.get("Rule"))
         _description: str = str(obj.get("description"))
         _title: str = str(obj.get("title"))
         return Group(_id, _Rule, _description, _title)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Group':
+        children: dict[str, ET.Element] = _children(elem)
+        _id: str = _intern(elem.get("id"))
+        _Rule: Rule = Rule.from_element(children["Rule"])
+        _description: str = _element_text(children.get("description"))
+        _title: str = _element_text(children.get("title"))
+        return Group(_id, _Rule, _description, _title)
+
 
-@ dataclass
+@ dataclass(slots=True)
 class PlainText:
     text: str
     id: str
@@ -93,8 +225,14 @@ class PlainText:
         _id: str = str(obj.get("@id"))
         return PlainText(_text, _id)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'PlainText':
+        _text: str = _element_text(elem)
+        _id: str = str(elem.get("id"))
+        return PlainText(_text, _id)
+
 
-@ dataclass
+@ dataclass(slots=True)
 class Profile:
     id: str
     description: str
@@ -110,8 +248,24 @@ class Profile:
         _title: str = str(obj.get("title"))
         return Profile(_id, _description, _select, _title)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Profile':
+        _id: str = str(elem.get("id"))
+        _description: str = str(None)
+        _select: list[Select] = []
+        _title: str = str(None)
+        for child in elem:
+            name: str = _local_name(child.tag)
+            if (name == "select"):
+                _select.append(Select.from_element(child))
+            elif (name == "description"):
+                _description = _element_text(child)
+            elif (name == "title"):
+                _title = _element_text(child)
+        return Profile(_id, _description, _select, _title)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Rule:
     id: str
     severity: str
@@ -126,8 +280,8 @@ class Rule:
     @ staticmethod
     def from_dict(obj: Any) -> 'Rule':
         _id: str = str(obj.get("@id"))
-        _severity: str = str(obj.get("@severity"))
-        _weight: str = str(obj.get("@weight"))
+        _severity: str = _intern(obj.get("@severity"))
+        _weight: str = _intern(obj.get("@weight"))
         _check: Check = Check.from_dict(obj.get("check"))
         _description: str = str(obj.get("description"))
         _fix: Fix = Fix.from_dict(obj.get("fix"))
@@ -136,20 +290,40 @@ class Rule:
         _version: str = str(obj.get("version"))
         return Rule(_id, _severity, _weight, _check, _description, _fix, _fixtext, _title, _version)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Rule':
+        children: dict[str, ET.Element] = _children(elem)
+        _id: str = str(elem.get("id"))
+        _severity: str = _intern(elem.get("severity"))
+        _weight: str = _intern(elem.get("weight"))
+        _check: Check = Check.from_element(children["check"])
+        _description: str = _element_text(children.get("description"))
+        _fix: Fix = Fix.from_element(children["fix"])
+        _fixtext: Fixtext = Fixtext.from_element(children["fixtext"])
+        _title: str = _element_text(children.get("title"))
+        _version: str = _element_text(children.get("version"))
+        return Rule(_id, _severity, _weight, _check, _description, _fix, _fixtext, _title, _version)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Select:
     idref: str
     selected: str
 
     @ staticmethod
     def from_dict(obj: Any) -> 'Select':
-        _idref: str = str(obj.get("@idref"))
-        _selected: str = str(obj.get("@selected"))
+        _idref: str = _intern(obj.get("@idref"))
+        _selected: str = _intern(obj.get("@selected"))
         return Select(_idref, _selected)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Select':
+        _idref: str = _intern(elem.get("idref"))
+        _selected: str = _intern(elem.get("selected"))
+        return Select(_idref, _selected)
 
-@ dataclass
+
+@ dataclass(slots=True)
 class Status:
     text: str
     date: str
@@ -160,6 +334,17 @@ class Status:
         _date: str = str(obj.get("@date"))
         return Status(_text, _date)
 
+    @ staticmethod
+    def from_element(elem: ET.Element) -> 'Status':
+        _text: str = _element_text(elem)
+        _date: str = str(elem.get("date"))
+        return Status(_text, _date)
+
+
+# Benchmark has fields named Group and Profile, which hide these classes in its body
+GroupType = Group
+ProfileType = Profile
+
 
 @ dataclass
 class Preference:
@@ -186,15 +371,22 @@ class StigParser:
         _Benchmark: Benchmark = Benchmark.from_dict(obj.get("Benchmark"))
         return StigParser(_Benchmark)
 
+    @ staticmethod
+    def parse_stream(stream: IO[bytes]) -> 'StigParser':
+        _Benchmark: Benchmark = Benchmark.from_stream(stream)
+        return StigParser(_Benchmark)
+
     @ staticmethod
     def parse_xccdf(xml_file: str) -> 'StigParser':
-        with open(xml_file, "r", encoding=ENCODING) as file:
-            xml_as_dict: OrderedDict[str, Any] = xmltodict.parse(file.read())
-        return StigParser.from_dict(xml_as_dict)
+        with open(xml_file, "rb") as file:
+            return StigParser.parse_stream(stream=file)
+
+    @ staticmethod
+    def parse_archive(archive: StigArchive) -> 'StigParser':
+        with archive.open_xccdf() as stream:
+            return StigParser.parse_stream(stream=stream)
 
     @ staticmethod
     def parse_zip(zip_file: str) -> 'StigParser':
-        file_as_bytes: bytes = StigZip.read_xccdf(zip_file_path=zip_file)
-        xml_as_dict: OrderedDict[str, Any] = xmltodict.parse(
-            file_as_bytes, encoding=ENCODING)
-        return StigParser.from_dict(obj=xml_as_dict)
+        with StigZip.open_xccdf(zip_file_path=zip_file) as stream:
+            return StigParser.parse_stream(stream=stream)
@@ -0,0 +1,235 @@
+import os
+import sys
+from typing import Optional
+
+from colorama import Fore, Style
+
+from stigGenerator import DEFAULT_DESCRIPTION, DEFAULT_TITLE, StigGenerator
+from stigIndex import StigIndex
+from stigJournal import StigJournal
+from stigParser import Benchmark, Group, Preference, Profile
+from stigScreen import StigScreen
+
+CHECKPOINT_FILE: str = os.path.join(os.path.dirname(
+    os.path.realpath(__file__)), "checkpoint.tmp")
+
+# Rules listed before a bulk decision, the rest are only counted
+QUERY_LISTED: int = 20
+
+
+# The interactive console. Batch runs never import this module, so they do
+# not load the console libraries either.
+class StigPrompt:
+
+    @staticmethod
+    def prompt_profile(benchmark: Benchmark) -> Profile:
+        journal: StigJournal = StigJournal(CHECKPOINT_FILE)
+        if (journal.exists()):
+            journal.replay()
+            if (journal.profile is not None):
+                return benchmark.Profile[journal.profile]
+
+            raise Exception(
+                "Invalid checkpoint file. Please remove the file and restart.")
+        else:
+            StigPrompt.__clear_console()
+            print(f"{Fore.GREEN}Please select a profile below:{Style.RESET_ALL}\n")
+            opt: int = 1
+            for profile in benchmark.Profile:
+                print(f"[{opt}] {profile.title}")
+                opt += 1
+
+            selected: int = int(
+                input(f"\n{Fore.GREEN}Selection: {Style.RESET_ALL}")) - 1
+
+            # Save as checkpoint
+            with journal:
+                journal.record_profile(selected)
+
+            return benchmark.Profile[selected]
+
+    @staticmethod
+    def prompt_preferences(selected_groups: list[Group]) -> list[Preference]:
+        # Answers given before a crash are replayed from the checkpoint
+        journal: StigJournal = StigJournal(CHECKPOINT_FILE)
+        journal.replay()
+
+        scan_preferences: list[Optional[Preference]] = [
+            journal.preferences.get(g.id) for g in selected_groups]
+        # Only the rules of this session can be revisited with "b"
+        prompted: list[int] = []
+        # Indexing reads every rule text, so it waits for the first query
+        index: Optional[StigIndex] = None
+
+        with StigScreen(selected_groups) as screen:
+            i: int = StigPrompt.__next_unanswered(scan_preferences, 0)
+            while (i < len(selected_groups)):
+                group: Group = selected_groups[i]
+                current: Optional[Preference] = scan_preferences[i]
+
+                StigPrompt.__clear_console()
+                print(screen.get(i))
+
+                previous: Optional[int] = StigPrompt.__get_previous(
+                    prompted, i)
+
+                # A revisited rule keeps its answer on an empty input
+                options: str = "Y/n"
+                if (current is not None and current.applicable is False):
+                    options = "y/N"
+                if (previous is not None):
+                    options += "/b"
+
+                invalid: bool = True
+                prompt: str = ""
+                while (invalid):
+                    answer: str = input(
+                        f"\n{StigScreen.separator()}\nDo you accept this rule for scan? ({i + 1}/{len(selected_groups)}) [{options}]: ")
+                    prompt = answer.capitalize()
+                    if (answer.startswith("/")):
+                        if (index is None):
+                            index = StigIndex(selected_groups)
+                        # A bulk decision that covers this rule moves on to the next one
+                        applied: list[int] = StigPrompt.__prompt_query(
+                            index, answer[1:], scan_preferences, journal)
+                        if (i in applied):
+                            invalid = False
+                    elif (prompt in ("Y", "N", "") or (prompt == "B" and previous is not None)):
+                        invalid = False
+
+                if (prompt == "B"):
+                    i = previous  # type: ignore
+                    continue
+
+                if (answer.startswith("/") is False):
+                    preference: Preference = None  # type: ignore
+                    if (prompt == "" and current is not None):
+                        preference = current
+                    elif (prompt == "N"):
+                        preference = Preference(
+                            id=group.id, rule=group.Rule.title, applicable=False, rationale=StigPrompt.__prompt_rationale())
+                    else:
+                        preference = Preference(
+                            id=group.id, rule=group.Rule.title, applicable=True, rationale="")
+
+                    scan_preferences[i] = preference
+
+                    # Save as checkpoint, the last answer for a rule wins on replay
+                    if (preference != current):
+                        journal.record(preference)
+
+                if (i not in prompted):
+                    prompted.append(i)
+
+                # After going back, the rules of this session are shown again
+                position: int = prompted.index(i)
+                if (position + 1 < len(prompted)):
+                    i = prompted[position + 1]
+                else:
+                    i = StigPrompt.__next_unanswered(
+                        scan_preferences, i + 1)
+
+        journal.close()
+        return scan_preferences  # type: ignore
+
+    @staticmethod
+    def __prompt_rationale() -> str:
+        invalid: bool = True  # Do not accept empty description
+        rationale: str = ""
+        while (invalid):
+            rationale = input(
+                "Provide rationale on why you do not want to implement this measure (at least 3 chars): ")
+            if (len(rationale) >= 3):
+                invalid = False
+        return rationale
+
+    @staticmethod
+    def __prompt_query(index: StigIndex, query: str, preferences: list[Optional[Preference]], journal: StigJournal) -> list[int]:
+        # Applies one decision to every selected rule matching the query,
+        # including the rules answered before. Returns the rules it changed.
+        try:
+            matches: list[int] = index.find(query)
+        except Exception as ex:
+            print(f"{Fore.RED}{ex}{Style.RESET_ALL}")
+            return []
+        if (len(matches) == 0):
+            print(f"{Fore.RED}No rules match \"{query}\".{Style.RESET_ALL}")
+            return []
+
+        answered: int = len([m for m in matches if preferences[m] is not None])
+        print(f"\n{Fore.YELLOW}{len(matches)} rules match \"{query}\", {answered} of them already answered:{Style.RESET_ALL}")
+        for m in matches[:QUERY_LISTED]:
+            print(f"{index.groups[m].id} {index.groups[m].Rule.title}")
+        if (len(matches) > QUERY_LISTED):
+            print(f"... and {len(matches) - QUERY_LISTED} more")
+
+        decision: str = input(
+            "Do you accept these rules for scan? [y/n/C]: ").capitalize()
+        if (decision not in ("Y", "N")):
+            return []
+        rationale: str = ""
+        if (decision == "N"):
+            rationale = StigPrompt.__prompt_rationale()
+
+        for m in matches:
+            group: Group = index.groups[m]
+            preference: Preference = Preference(
+                id=group.id, rule=group.Rule.title, applicable=decision == "Y", rationale=rationale)
+            if (preference != preferences[m]):
+                preferences[m] = preference
+                journal.record(preference)
+        print(f"{len(matches)} rules {'accepted' if decision == 'Y' else 'rejected'}.")
+        return matches
+
+    @staticmethod
+    def __get_previous(prompted: list[int], index: int) -> Optional[int]:
+        position: int = len(prompted)
+        if (index in prompted):
+            position = prompted.index(index)
+        if (position == 0):
+            return None
+        return prompted[position - 1]
+
+    @staticmethod
+    def __next_unanswered(preferences: list[Optional[Preference]], start: int) -> int:
+        for i in range(start, len(preferences)):
+            if (preferences[i] is None):
+                return i
+        return len(preferences)
+
+    @staticmethod
+    def carry_over(preferences: list[Preference]) -> None:
+        # Carried decisions go into the checkpoint, so the prompts skip them
+        journal: StigJournal = StigJournal(CHECKPOINT_FILE)
+        journal.replay()
+        with journal:
+            for preference in preferences:
+                if (preference.id not in journal.preferences):
+                    journal.record(preference)
+
+    @staticmethod
+    def get_custom_profile(preferences: list[Preference], default_title: str = DEFAULT_TITLE, default_description: str = DEFAULT_DESCRIPTION) -> Profile:
+        custom_title: str = input(f"Title for you profile [{default_title}]: ")
+        custom_description: str = input(
+            f"Description for your profile [{default_description}]: ")
+        return StigGenerator.build_custom_profile(
+            preferences=preferences, title=custom_title or default_title, description=custom_description or default_description)
+
+    @staticmethod
+    def cleanup() -> None:
+        StigJournal(CHECKPOINT_FILE).remove()
+
+    @staticmethod
+    def __clear_console() -> None:
+        if (sys.platform == "win32"):
+            _: int = StigPrompt.__clear_win32()
+        else:
+            _: int = StigPrompt.__clear_unix()
+
+    @staticmethod
+    def __clear_unix() -> int:
+        return os.system(command='clear')
+
+    @staticmethod
+    def __clear_win32() -> int:
+        return os.system(command='cls')
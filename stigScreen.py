@@ -0,0 +1,85 @@
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from colorama import Fore, Style
+
+from stigParser import Group
+
+TAG_PATTERN: re.Pattern[str] = re.compile(r"</?[A-Za-z]+>")
+CODE_PATTERN: re.Pattern[str] = re.compile(r"(\$.+)")
+CODE_REPLACEMENT: str = fr"{Fore.GREEN}\1{Style.RESET_ALL}"
+
+# Rules rendered ahead of the reviewer, and rendered screens kept for going back
+PREFETCH: int = 4
+CACHE_SIZE: int = 32
+
+
+class StigScreen:
+
+    groups: list[Group]
+    prefetch: int
+    cache_size: int
+
+    def __init__(self, groups: list[Group], prefetch: int = PREFETCH, cache_size: int = CACHE_SIZE) -> None:
+        self.groups = groups
+        self.prefetch = prefetch
+        self.cache_size = max(cache_size, prefetch + 1)
+        self.__screens: OrderedDict[int, Future[str]] = OrderedDict()
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="StigScreen")
+
+    def __enter__(self) -> 'StigScreen':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def get(self, index: int) -> str:
+        self.__submit(index)
+        self.__screens.move_to_end(index)
+        screen: Future[str] = self.__screens[index]
+        # Rendering of the next rules starts while the reviewer reads this one
+        for i in range(index + 1, min(index + self.prefetch + 1, len(self.groups))):
+            self.__submit(i)
+        return screen.result()
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+        self.__screens.clear()
+
+    @staticmethod
+    def render(group: Group) -> str:
+        header: str = f"{Fore.YELLOW}Title:{Style.RESET_ALL} {group.Rule.title}\n(severity: {Fore.RED}{group.Rule.severity}{Style.RESET_ALL}, weight: {Fore.RED}{group.Rule.weight}{Style.RESET_ALL})"
+
+        # Fix new lines
+        desc: str = group.Rule.description.replace("\\\\n", "\n")
+        # Get rid of leftover XML tags
+        desc = TAG_PATTERN.sub("", desc)
+
+        # Fix new lines, and format code
+        mitigation: str = CODE_PATTERN.sub(
+            CODE_REPLACEMENT, group.Rule.fixtext.text.replace("\\\\n", "\n"))
+        control: str = CODE_PATTERN.sub(
+            CODE_REPLACEMENT, group.Rule.check.check_content.replace("\\\\n", "\n"))
+
+        return (f"{header}\n"
+                f"\n{Fore.YELLOW}Description:{Style.RESET_ALL}\n{desc}\n"
+                f"\n{Fore.YELLOW}Mitigation:{Style.RESET_ALL}\n{mitigation}\n"
+                f"\n{Fore.YELLOW}Control:{Style.RESET_ALL}\n{control}")
+
+    @staticmethod
+    def separator() -> str:
+        return "*" * os.get_terminal_size().columns
+
+    def __submit(self, index: int) -> None:
+        if (index in self.__screens):
+            return
+        self.__screens[index] = self.__executor.submit(
+            StigScreen.render, self.groups[index])
+        # Least recently shown screens go first
+        while (len(self.__screens) > self.cache_size):
+            _, future = self.__screens.popitem(last=False)
+            future.cancel()
@@ -0,0 +1,133 @@
+import glob
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Optional
+
+from stigParser import Benchmark, Group, Preference, Profile, StigParser
+from stigZip import StigArchive
+
+ENCODING: str = "utf-8"
+
+REPORT_FILE: str = "changes.xml"
+
+ADDED: str = "added"
+MODIFIED: str = "modified"
+REMOVED: str = "removed"
+UNREVIEWED: str = "unreviewed"
+
+
+@dataclass
+class RuleChange:
+    id: str
+    title: str
+    change: str
+    fields: list[str]
+
+
+class StigUpgrade:
+
+    previous_zip: str
+    benchmark: Benchmark
+    profile: Optional[Profile]
+    decisions: dict[str, Preference]
+
+    def __init__(self, previous_directory: str) -> None:
+        # The output folder of the previous run: *_custom.zip and rationale.xml.
+        # The custom Ansible role zip, e.g. rhel8STIG-ansible_custom.zip, is skipped.
+        candidates: list[str] = [c for c in glob.glob(os.path.join(previous_directory, "*_custom.zip"))
+                                 if c.lower().endswith("ansible_custom.zip") is False]
+        if (len(candidates) != 1):
+            raise Exception(
+                f"Expected one custom STIG zip file in {previous_directory}, found {len(candidates)}.")
+        rationale_file: str = os.path.join(previous_directory, "rationale.xml")
+        if (os.access(rationale_file, os.R_OK) is False):
+            raise Exception(f"Cannot read {rationale_file}.")
+
+        self.previous_zip = candidates[0]
+        with StigArchive(self.previous_zip) as archive:
+            self.benchmark = StigParser.parse_archive(archive=archive).Benchmark
+
+        root: ET.Element = ET.parse(rationale_file).getroot()
+        profile_title: str = str(root.attrib.get("profile"))
+        self.profile = next(
+            (p for p in self.benchmark.Profile if p.title == profile_title), None)
+        if (self.profile is None):
+            raise Exception(
+                f"Custom profile \"{profile_title}\" could not be found in {self.previous_zip}.")
+
+        # Accepted rules are selected in the custom profile, rejected ones are in rationale.xml
+        self.decisions = {}
+        for s in self.profile.select:
+            group: Optional[Group] = self.benchmark.get_group(s.idref)
+            if (s.selected == "true" and group is not None):
+                self.decisions[s.idref] = Preference(
+                    id=s.idref, rule=group.Rule.title, applicable=True, rationale="")
+        for item in root:
+            rule: Optional[str] = item.attrib.get("rule")
+            if (rule):
+                self.decisions[rule] = Preference(id=rule, rule=str(item.attrib.get("title")),
+                                                  applicable=False, rationale=str(item.attrib.get("rationale")))
+
+    def compare(self, selected_groups: list[Group]) -> tuple[list[Preference], list[RuleChange]]:
+        # Decisions of unchanged rules are carried over, the rest need a review
+        carried: list[Preference] = []
+        changes: list[RuleChange] = []
+        for group in selected_groups:
+            previous: Optional[Group] = self.benchmark.get_group(group.id)
+            decision: Optional[Preference] = self.decisions.get(group.id)
+            if (previous is None):
+                changes.append(RuleChange(group.id, group.Rule.title, ADDED, []))
+            elif (StigUpgrade.fingerprint(previous) != StigUpgrade.fingerprint(group)):
+                changes.append(RuleChange(group.id, group.Rule.title, MODIFIED,
+                                          StigUpgrade.get_changed_fields(previous, group)))
+            elif (decision is None):
+                changes.append(RuleChange(
+                    group.id, group.Rule.title, UNREVIEWED, []))
+            else:
+                carried.append(Preference(id=group.id, rule=group.Rule.title,
+                                          applicable=decision.applicable, rationale=decision.rationale))
+
+        selected_ids: set[str] = {g.id for g in selected_groups}
+        for id, decision in self.decisions.items():
+            if (id not in selected_ids):
+                changes.append(RuleChange(id, decision.rule, REMOVED, []))
+        return carried, changes
+
+    @staticmethod
+    def fingerprint(group: Group) -> str:
+        # Titles and descriptions are often reworded, only these change what is checked
+        content: str = "\0".join(StigUpgrade.__get_fields(group).values())
+        return hashlib.sha256(content.encode(ENCODING)).hexdigest()
+
+    @staticmethod
+    def get_changed_fields(previous: Group, current: Group) -> list[str]:
+        previous_fields: dict[str, str] = StigUpgrade.__get_fields(previous)
+        return [name for name, value in StigUpgrade.__get_fields(current).items()
+                if previous_fields[name] != value]
+
+    @staticmethod
+    def save_report(changes: list[RuleChange], previous_zip: str, carried: int, path: str) -> None:
+        attrs: dict = {}
+        attrs["previous"] = os.path.basename(previous_zip)
+        attrs["carried"] = str(carried)
+        root: ET.Element = ET.Element("changes", attrs)
+        for c in changes:
+            attrs = {}
+            attrs["rule"] = c.id
+            attrs["title"] = c.title
+            attrs["change"] = c.change
+            if (len(c.fields) > 0):
+                attrs["fields"] = " ".join(c.fields)
+            root.append(ET.Element("item", attrs))
+
+        with open(path, "w", encoding=ENCODING) as file:
+            ET.indent(tree=root)
+            file.write(ET.tostring(root, "unicode"))
+
+    @staticmethod
+    def __get_fields(group: Group) -> dict[str, str]:
+        return {"version": group.Rule.version,
+                "check": group.Rule.check.check_content,
+                "fixtext": group.Rule.fixtext.text}
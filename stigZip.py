@@ -1,68 +1,287 @@
+import copy
+import io
 import os
+import re
+import shutil
+import struct
+import sys
+import time
 from dataclasses import dataclass
-from typing import Optional
-from zipfile import ZipFile
+from typing import IO, Any, Optional
+from zipfile import ZIP64_LIMIT, ZIP_STORED, ZipFile, ZipInfo
 
 ENCODING: str = "utf-8"
 
+XCCDF_PATTERN: re.Pattern[str] = re.compile(r"-xccdf\.xml$", re.IGNORECASE)
+ANSIBLE_PATTERN: re.Pattern[str] = re.compile(r"ansible\.zip$", re.IGNORECASE)
+TASKS_PATTERN: re.Pattern[str] = re.compile(r"^roles/[^/]+/tasks/main\.yml$")
+
+# Local file header layout, see APPNOTE.TXT 4.3.7
+LOCAL_HEADER_FORMAT: str = "<4s2B4HL2L2H"
+LOCAL_HEADER_SIZE: int = struct.calcsize(LOCAL_HEADER_FORMAT)
+FILENAME_LENGTH: int = 10
+EXTRA_FIELD_LENGTH: int = 11
+ENCRYPTED_FLAG: int = 0x01
+DATA_DESCRIPTOR_FLAG: int = 0x08
+CHUNK_SIZE: int = 1024 * 1024
+
+# Raw member access uses ZipFile internals that are not part of its API. It is
+# only enabled on the versions it was checked against, the others fall back to
+# the public open() API.
+RAW_ACCESS: bool = ((3, 9) <= sys.version_info[:2] <= (3, 13)
+                    and hasattr(ZipFile, "_writecheck") and hasattr(ZipInfo, "FileHeader"))
+
+
+def _read_exact(source: IO[bytes], size: int) -> bytes:
+    # A raw stream may return fewer bytes than asked for
+    chunks: list[bytes] = []
+    while (size > 0):
+        chunk: bytes = source.read(size)
+        if (not chunk):
+            raise Exception("Unexpected end of zip file.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class MemberStream(io.RawIOBase):
+
+    # Read-only window over the data of a stored zip member, so that a nested
+    # zip can be opened in place with its own file handle.
+    def __init__(self, path: str, offset: int, size: int) -> None:
+        super().__init__()
+        self.__file: IO[bytes] = open(path, "rb")
+        self.__offset: int = offset
+        self.__size: int = size
+        self.__position: int = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.__position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if (whence == os.SEEK_CUR):
+            offset += self.__position
+        elif (whence == os.SEEK_END):
+            offset += self.__size
+        if (offset < 0):
+            raise ValueError("Negative seek position.")
+        self.__position = offset
+        return self.__position
+
+    def readinto(self, buffer: Any) -> int:
+        # Fills the buffer up to the end of the member, zipfile does not retry short reads
+        length: int = max(0, min(len(buffer), self.__size - self.__position))
+        view: memoryview = memoryview(buffer)
+        total: int = 0
+        self.__file.seek(self.__offset + self.__position)
+        while (total < length):
+            read: int = self.__file.readinto(view[total:length])  # type: ignore
+            if (not read):
+                break
+            total += read
+        self.__position += total
+        return total
+
+    def close(self) -> None:
+        self.__file.close()
+        super().close()
+
+
+class StigArchive:
+
+    path: str
+    archive: ZipFile
+
+    def __init__(self, path: str, file: Optional[IO[bytes]] = None) -> None:
+        # A nested archive is read from file, path is its name in the outer zip
+        self.path = path
+        self.archive = ZipFile(file or path, 'r')
+        self.__file: Optional[IO[bytes]] = file
+        self.__names: list[str] = self.archive.namelist()
+        self.__xccdf_name: Optional[str] = None
+
+    def __enter__(self) -> 'StigArchive':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.archive.close()
+        if (self.__file is not None):
+            self.__file.close()
+
+    def find_members(self, pattern: re.Pattern[str]) -> list[str]:
+        return [n for n in self.__names if pattern.search(n)]
+
+    @property
+    def xccdf_name(self) -> str:
+        if (self.__xccdf_name is None):
+            candidates: list[str] = self.find_members(XCCDF_PATTERN)
+            if (len(candidates) == 0):
+                raise Exception("XCCDF file could not be found in the STIG zip file.")
+            # Prefer the manual benchmark when the package ships more than one
+            manual: list[str] = [c for c in candidates if "manual" in c.lower()]
+            self.__xccdf_name = (manual or candidates)[0]
+        return self.__xccdf_name
+
+    @property
+    def ansible_name(self) -> Optional[str]:
+        candidates: list[str] = self.find_members(ANSIBLE_PATTERN)
+        return candidates[-1] if candidates else None
+
+    @property
+    def tasks_name(self) -> str:
+        candidates: list[str] = self.find_members(TASKS_PATTERN)
+        if (len(candidates) == 0):
+            raise Exception("Ansible tasks could not be found in the Ansible zip file.")
+        return candidates[0]
+
+    def open_xccdf(self) -> IO[bytes]:
+        return self.archive.open(self.xccdf_name)
+
+    def read_xccdf(self) -> bytes:
+        return self.archive.read(self.xccdf_name)
+
+    def extract_xccdf(self, output_directory: str) -> tuple[str, str]:
+        self.archive.extract(self.xccdf_name, output_directory)
+        folder_name, _, xccdf_file_name = self.xccdf_name.rpartition("/")
+        return folder_name, xccdf_file_name
+
+    def extract_ansible_zip(self, output_directory: str) -> Optional[str]:
+        extractedZip: Optional[str] = self.ansible_name
+        if (extractedZip is not None):
+            self.archive.extract(member=extractedZip, path=output_directory)
+        return extractedZip
+
+    def open_ansible_zip(self) -> Optional['StigArchive']:
+        # The role zip is read without extracting it. A stored member is read in
+        # place from the outer file, a compressed one is inflated into memory.
+        name: Optional[str] = self.ansible_name
+        if (name is None):
+            return None
+        item: ZipInfo = self.archive.getinfo(name)
+        if (RAW_ACCESS and item.compress_type == ZIP_STORED and item.flag_bits & ENCRYPTED_FLAG == 0):
+            # Buffered, as zipfile reads headers a few bytes at a time
+            return StigArchive(name, io.BufferedReader(MemberStream(self.path, self.__get_data_offset(item), item.compress_size)))
+        return StigArchive(name, io.BytesIO(self.archive.read(name)))
+
+    def read(self, name: str) -> bytes:
+        return self.archive.read(name)
+
+    def read_ansible_tasks(self) -> bytes:
+        return self.archive.read(self.tasks_name)
+
+    def generate_stig_zip(self, output_directory: str, modified_xccdf: bytes, raw: bool = True) -> None:
+        self.repack(path=os.path.join(output_directory, self.custom_name),
+                    replacements={self.xccdf_name: modified_xccdf}, raw=raw)
+
+    @property
+    def custom_name(self) -> str:
+        return os.path.basename(self.path).replace(".zip", "_custom.zip")
+
+    def repack(self, path: str, replacements: dict[str, bytes], raw: bool = True) -> None:
+        # Members are copied one by one in their original order, only the
+        # replaced ones are compressed again
+        with ZipFile(path, 'w') as zout:
+            for item in self.archive.infolist():
+                if (item.filename in replacements):
+                    modified_item: ZipInfo = copy.copy(item)
+                    modified_item.date_time = time.localtime()[:6]
+                    zout.writestr(modified_item, replacements[item.filename])
+                elif (raw and self.__can_copy_raw(item)):
+                    self.__copy_raw(item=item, zout=zout)
+                else:
+                    # Streamed through the public API, in chunks
+                    with self.archive.open(item) as source, zout.open(copy.copy(item), 'w', force_zip64=item.file_size > ZIP64_LIMIT) as target:
+                        shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+    def has_member(self, name: str) -> bool:
+        return name in self.__names
+
+    def __can_copy_raw(self, item: ZipInfo) -> bool:
+        # Zip64 members need their extra fields rewritten, let zipfile handle them
+        return RAW_ACCESS and item.file_size <= ZIP64_LIMIT and item.compress_size <= ZIP64_LIMIT
+
+    def __get_data_offset(self, item: ZipInfo) -> int:
+        # Skip the local header of the member to reach its compressed data
+        with self.archive._lock:  # type: ignore
+            source: IO[bytes] = self.archive.fp  # type: ignore
+            source.seek(item.header_offset)
+            header: tuple = struct.unpack(
+                LOCAL_HEADER_FORMAT, _read_exact(source, LOCAL_HEADER_SIZE))
+        return item.header_offset + LOCAL_HEADER_SIZE + header[FILENAME_LENGTH] + header[EXTRA_FIELD_LENGTH]
+
+    def __copy_raw(self, item: ZipInfo, zout: ZipFile) -> None:
+        # The compressed data is copied as it is, the same way zipfile writes a
+        # member: under the lock of each archive, with the writer state updated.
+        offset: int = self.__get_data_offset(item)
+
+        # CRC and sizes are known up front, so no data descriptor is needed
+        raw_item: ZipInfo = copy.copy(item)
+        raw_item.flag_bits &= ~DATA_DESCRIPTOR_FLAG
+        with self.archive._lock, zout._lock:  # type: ignore
+            if (getattr(zout, "_writing", False)):
+                raise Exception("Cannot copy a zip member while another one is being written.")
+            zout._writecheck(raw_item)  # type: ignore
+            source: IO[bytes] = self.archive.fp  # type: ignore
+            target: IO[bytes] = zout.fp  # type: ignore
+            source.seek(offset)
+            target.seek(zout.start_dir)  # type: ignore
+            raw_item.header_offset = target.tell()
+            target.write(raw_item.FileHeader(zip64=False))
+
+            remaining: int = item.compress_size
+            while (remaining > 0):
+                chunk: bytes = _read_exact(source, min(CHUNK_SIZE, remaining))
+                target.write(chunk)
+                remaining -= len(chunk)
+
+            zout._didModify = True  # type: ignore
+            zout.filelist.append(raw_item)
+            zout.NameToInfo[raw_item.filename] = raw_item
+            zout.start_dir = target.tell()  # type: ignore
+
 
 @dataclass
 class StigZip:
 
     @staticmethod
     def read_xccdf(zip_file_path: str) -> bytes:
-        archive: ZipFile = ZipFile(zip_file_path, 'r')
-        base_file_name: str = os.path.basename(zip_file_path)
-        folder_name: str = base_file_name.replace(
-            "_STIG", "_Manual_STIG").removesuffix(".zip")
-        xccdf_file_name: str = folder_name.replace(
-            "_STIG", "-xccdf.xml").replace("_V1R6", "_STIG_V1R6")
-        file_as_bytes: bytes = archive.read(f"{folder_name}/{xccdf_file_name}")
+        with StigArchive(zip_file_path) as archive:
+            return archive.read_xccdf()
+
+    @staticmethod
+    def open_xccdf(zip_file_path: str) -> IO[bytes]:
+        archive: StigArchive = StigArchive(zip_file_path)
+        # The member stream keeps the underlying file open after the archive is closed
+        stream: IO[bytes] = archive.open_xccdf()
         archive.close()
-        return file_as_bytes
+        return stream
 
     @staticmethod
     def extract_xccdf(zip_file_path: str, output_directory: str) -> tuple[str, str]:
-        archive: ZipFile = ZipFile(zip_file_path, 'r')
-        base_file_name: str = os.path.basename(zip_file_path)
-        folder_name: str = base_file_name.replace(
-            "_STIG", "_Manual_STIG").removesuffix(".zip")
-        xccdf_file_name: str = folder_name.replace(
-            "_STIG", "-xccdf.xml").replace("_V1R6", "_STIG_V1R6")
-        archive.extract(f"{folder_name}/{xccdf_file_name}", output_directory)
-        archive.close()
-        return folder_name, xccdf_file_name
+        with StigArchive(zip_file_path) as archive:
+            return archive.extract_xccdf(output_directory=output_directory)
 
     @staticmethod
     def extract_ansible_zip(zip_file_path: str, output_directory: str) -> Optional[str]:
-        archive: ZipFile = ZipFile(zip_file_path, 'r')
-        extractedZip: Optional[str] = None
-        for i, file in enumerate(archive.filelist):
-            if (file.filename.endswith("ansible.zip")):
-                extractedZip = file.filename
-                archive.extract(member=extractedZip, path=output_directory)
-        archive.close()
-        return extractedZip
+        with StigArchive(zip_file_path) as archive:
+            return archive.extract_ansible_zip(output_directory=output_directory)
 
     @staticmethod
     def read_ansible_tasks(zip_file_path: str) -> bytes:
-        archive: ZipFile = ZipFile(zip_file_path, 'r')
-        base_file_name: str = os.path.basename(zip_file_path)
-        folder_name: str = base_file_name.replace("-ansible.zip", "")
-        file_as_bytes: bytes = archive.read(
-            f"roles/{folder_name}/tasks/main.yml")
-        archive.close()
-        return file_as_bytes
+        with StigArchive(zip_file_path) as archive:
+            return archive.read_ansible_tasks()
 
     @staticmethod
-    def generate_stig_zip(zip_file_path: str, output_directory: str, folder_in_zip: str, xccdf_file_in_zip: str, modified_xccdf: str) -> None:
-        zin: ZipFile = ZipFile(zip_file_path, 'r')
-        zout: ZipFile = ZipFile(os.path.join(
-            output_directory, os.path.basename(zip_file_path).replace(".zip", "_custom.zip")), 'w')
-        for item in zin.infolist():
-            buffer: bytes = zin.read(item.filename)
-            if (item.filename.find(xccdf_file_in_zip) == -1):
-                zout.writestr(item, buffer)
-        zout.write(modified_xccdf, f"{folder_in_zip}/{xccdf_file_in_zip}")
-        zout.close()
-        zin.close()
+    def generate_stig_zip(zip_file_path: str, output_directory: str, modified_xccdf: bytes, raw: bool = True) -> None:
+        with StigArchive(zip_file_path) as archive:
+            archive.generate_stig_zip(
+                output_directory=output_directory, modified_xccdf=modified_xccdf, raw=raw)
@@ -0,0 +1,130 @@
+import os
+import random
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile
+
+ENCODING: str = "utf-8"
+
+SYNTHETIC_NAME: str = "U_Synthetic_V1R1_STIG"
+SYNTHETIC_ROLE: str = "syntheticSTIG"
+FIRST_RULE: int = 200000
+SEVERITIES: list[str] = ["low", "medium", "high"]
+
+
+class StigSynthetic:
+
+    @staticmethod
+    def generate_xccdf(groups: int, profiles: int, seed: int = 0) -> bytes:
+        # Same layout as the DISA manual XCCDF files, a single line document
+        rnd: random.Random = random.Random(seed)
+        rules: list[int] = StigSynthetic.get_rule_numbers(groups)
+        parts: list[str] = [
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<Benchmark xmlns:dsig="http://www.w3.org/2000/09/xmldsig#" xmlns:xhtml="http://www.w3.org/1999/xhtml" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:cpe="http://cpe.mitre.org/language/2.0" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" id="Synthetic_STIG" xml:lang="en" '
+            'xmlns="http://checklists.nist.gov/xccdf/1.1">'  # DevSkim: ignore DS137138
+            '<status date="2023-01-01">accepted</status>'
+            '<title>Synthetic Security Technical Implementation Guide</title>'
+            '<description>Generated for benchmarking baseliner.</description>'
+            '<notice id="terms-of-use" xml:lang="en"></notice>'
+            '<reference href="https://cyber.mil"><dc:publisher>DISA</dc:publisher></reference>'
+            '<plain-text id="release-info">Release: 1 Benchmark Date: 01 Jan 2023</plain-text>'
+            '<plain-text id="generator">baseliner</plain-text>'
+            '<version>1</version>']
+
+        for p in range(profiles):
+            parts.append(f'<Profile id="MAC-{p + 1}_Synthetic"><title>Synthetic profile {p + 1}</title>'
+                         '<description>&lt;ProfileDescription&gt;&lt;/ProfileDescription&gt;</description>')
+            for number in rules:
+                if (p == 0 or rnd.random() < 0.8):
+                    parts.append(
+                        f'<select idref="V-{number}" selected="true" />')
+            parts.append('</Profile>')
+
+        for number in rules:
+            severity: str = rnd.choice(SEVERITIES)
+            discussion: str = escape(
+                f"<VulnDiscussion>Rule {number} protects the system. " + "Lorem ipsum dolor sit amet. " * 20 + "</VulnDiscussion>")
+            parts.append(f'<Group id="V-{number}"><title>SRG-OS-{number}-GPOS-00001</title>'
+                         '<description>&lt;GroupDescription&gt;&lt;/GroupDescription&gt;</description>'
+                         f'<Rule id="SV-{number}r1_rule" weight="10.0" severity="{severity}">'
+                         f'<version>SYNT-00-{number}</version>'
+                         f'<title>The system must configure synthetic setting {number}.</title>'
+                         f'<description>{discussion}</description>'
+                         '<reference><dc:title>DPMS Target Synthetic</dc:title></reference>'
+                         '<ident system="http://cyber.mil/cci">CCI-000001</ident>'
+                         f'<fixtext fixref="F-{number}r1_fix">Configure the setting with:\n\n$ sudo synthetic --enable {number}</fixtext>'
+                         f'<fix id="F-{number}r1_fix" />'
+                         f'<check system="C-{number}r1_chk"><check-content-ref href="Synthetic_STIG.xml" name="M" />'
+                         f'<check-content>Verify the setting with:\n\n$ synthetic --status {number}\n\nIf it is disabled, this is a finding.</check-content>'
+                         '</check></Rule></Group>')
+
+        parts.append('</Benchmark>')
+        return ''.join(parts).encode(ENCODING)
+
+    @staticmethod
+    def generate_tasks(groups: int, tasks: int) -> str:
+        # Tasks are spread over the rules, some of them need the exclamation mark workaround
+        rules: list[int] = StigSynthetic.get_rule_numbers(groups)
+        parts: list[str] = ["---\n"]
+        for i in range(tasks):
+            number: int = rules[i % len(rules)]
+            if (i % 10 == 9):
+                parts.append(f"- name: stigrule_{number}_service_{i}\n"
+                             f"  shell: ! systemctl is-enabled synthetic{number}\n"
+                             f"  register: stigrule_{number}_result\n"
+                             "  changed_when: false\n"
+                             "  failed_when: false\n"
+                             "  when:\n"
+                             f"    - {SYNTHETIC_ROLE}_stigrule_{number}_Manage\n")
+            else:
+                parts.append(f"- name: stigrule_{number}_setting_{i}\n"
+                             "  lineinfile:\n"
+                             "    path: /etc/synthetic.conf\n"
+                             f"    regexp: '^setting{number}='\n"
+                             f"    line: 'setting{number}=1'\n"
+                             "    create: yes\n"
+                             "  when:\n"
+                             f"    - {SYNTHETIC_ROLE}_stigrule_{number}_Manage\n"
+                             f"  notify: {SYNTHETIC_ROLE.lower()}_restart_synthetic\n")
+        return ''.join(parts)
+
+    @staticmethod
+    def generate_zips(directory: str, groups: int, profiles: int, tasks: int, name: str = SYNTHETIC_NAME) -> tuple[str, str]:
+        # U_X_STIG.zip/U_X_Manual_STIG/U_X_Manual-xccdf.xml and
+        # U_X_STIG_Ansible.zip/<role>-ansible.zip/roles/<role>/tasks/main.yml
+        stig_zip: str = os.path.join(directory, f"{name}.zip")
+        folder_name: str = name.replace("_STIG", "_Manual_STIG")
+        xccdf_file_name: str = name.replace("_STIG", "_Manual-xccdf.xml")
+        with ZipFile(stig_zip, "w", ZIP_DEFLATED) as archive:
+            archive.writestr(f"{folder_name}/{xccdf_file_name}",
+                             StigSynthetic.generate_xccdf(groups=groups, profiles=profiles))
+            archive.writestr(f"{folder_name}/STIG_unclass.xsl",
+                             "<xsl:stylesheet />" * 4096)
+            archive.writestr(f"{folder_name}/{name}_Overview.pdf",
+                             random.Random(groups).randbytes(512 * 1024))
+
+        rules: list[int] = StigSynthetic.get_rule_numbers(groups)
+        role_zip: str = os.path.join(directory, f"{SYNTHETIC_ROLE}-ansible.zip")
+        with ZipFile(role_zip, "w", ZIP_DEFLATED) as archive:
+            archive.writestr("site.yml",
+                             f"- hosts: all\n  roles:\n    - {SYNTHETIC_ROLE}\n")
+            archive.writestr("enforce.sh", "#!/bin/sh\nansible-playbook -v -b -i /dev/null site.yml\n")
+            archive.writestr(f"roles/{SYNTHETIC_ROLE}/tasks/main.yml",
+                             StigSynthetic.generate_tasks(groups=groups, tasks=tasks))
+            archive.writestr(f"roles/{SYNTHETIC_ROLE}/handlers/main.yml",
+                             f"- name: {SYNTHETIC_ROLE.lower()}_restart_synthetic\n  service:\n    name: synthetic\n    state: restarted\n")
+            archive.writestr(f"roles/{SYNTHETIC_ROLE}/defaults/main.yml",
+                             ''.join(f"{SYNTHETIC_ROLE}_stigrule_{n}_Manage: True\n" for n in rules))
+
+        ansible_zip: str = os.path.join(directory, f"{name}_Ansible.zip")
+        with ZipFile(ansible_zip, "w", ZIP_DEFLATED) as archive:
+            archive.write(role_zip, os.path.basename(role_zip))
+        os.remove(role_zip)
+
+        return stig_zip, ansible_zip
+
+    @staticmethod
+    def get_rule_numbers(groups: int) -> list[int]:
+        return list(range(FIRST_RULE, FIRST_RULE + groups))
@@ -0,0 +1,137 @@
+import io
+import os
+from zipfile import ZipFile
+
+import pytest
+
+from stigAnsible import StigAnsible
+from stigZip import StigArchive
+from tests.synthetic import SYNTHETIC_ROLE, StigSynthetic
+
+ROLE: str = f"roles/{SYNTHETIC_ROLE}/"
+
+
+def read_role(ansible_zip: str) -> ZipFile:
+    with ZipFile(ansible_zip) as archive:
+        return ZipFile(io.BytesIO(archive.read(f"{SYNTHETIC_ROLE}-ansible.zip")))
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_package_matches_tasks_file(tmp_path, streaming: bool) -> None:
+    _, ansible_zip = StigSynthetic.generate_zips(
+        directory=str(tmp_path), groups=20, profiles=1, tasks=20)
+    output_dir: str = str(tmp_path)
+    denylist: list[str] = [str(n) for n in StigSynthetic.get_rule_numbers(20)[::2]]
+    StigAnsible(streaming=streaming).generate(
+        ansible_zip=ansible_zip, output_directory=output_dir, denylist=denylist)
+
+    with open(os.path.join(output_dir, "custom.tasks.main.yml"), "r", encoding="utf-8", newline="") as file:
+        tasks: str = file.read()
+    package: ZipFile = ZipFile(os.path.join(
+        output_dir, f"{SYNTHETIC_ROLE}-ansible_custom.zip"))
+    assert package.read(ROLE + "tasks/main.yml").decode("utf-8") == tasks
+    assert all(f"stigrule_{n}_" not in tasks for n in denylist)
+
+    # Variables are never removed
+    original: ZipFile = read_role(ansible_zip)
+    assert package.read(ROLE + "defaults/main.yml") == original.read(ROLE + "defaults/main.yml")
+    # The handler is still notified by the kept tasks
+    assert package.read(ROLE + "handlers/main.yml") == original.read(ROLE + "handlers/main.yml")
+
+
+TASKS: str = ("---\n"
+              "# Tasks of the role\n"
+              "- name: stigrule_1_first\n"
+              "  shell: |\n"
+              "    echo one\n"
+              "\n"
+              "    echo two\n"
+              "\n"
+              "# Comment of the second rule\n"
+              "- name: stigrule_2_second\n"
+              "  command: /bin/true\n"
+              "\n"
+              "# Comment of the third rule\n"
+              "- name: stigrule_3_third\n"
+              "  command: /bin/false\n"
+              "# Trailing comment\n")
+
+
+def test_split_tasks_attaches_comments_to_the_next_task() -> None:
+    header, blocks = StigAnsible.split_tasks(text=TASKS)
+    assert header == "---\n# Tasks of the role\n"
+    assert blocks[0].endswith("    echo two\n")
+    assert blocks[1].startswith("\n# Comment of the second rule\n- name: stigrule_2_second\n")
+    assert blocks[2].startswith("\n# Comment of the third rule\n- name: stigrule_3_third\n")
+    assert header + ''.join(blocks) == TASKS
+
+
+@pytest.mark.parametrize("denied,removed", [("2", "second"), ("1", "first"), ("3", "third")])
+def test_partition_text_removes_leading_comments(denied: str, removed: str) -> None:
+    kept, skipped = StigAnsible(streaming=True).partition_text(
+        text=TASKS, denylist=[denied])
+    assert f"stigrule_{denied}_{removed}" in skipped
+    assert f"rule_{denied}_" not in kept
+    assert "# Tasks of the role\n" in kept
+    for number, name in (("1", "first"), ("2", "second"), ("3", "third")):
+        if (number != denied):
+            assert f"- name: stigrule_{number}_{name}\n" in kept
+            if (number != "1"):
+                assert f"# Comment of the {name} rule\n- name: stigrule_{number}_{name}\n" in kept
+    if (denied != "1"):
+        assert f"Comment of the {removed} rule" not in kept
+
+
+INDENTED_TASKS: str = ("---\n"
+                       "  - name: stigrule_1_first\n"
+                       "    command: /bin/true\n"
+                       "  - name: stigrule_2_second\n"
+                       "    command: /bin/false\n")
+
+
+def test_partition_text_reads_indented_tasks() -> None:
+    ansible: StigAnsible = StigAnsible(streaming=True)
+    kept, skipped = ansible.partition_text(text=INDENTED_TASKS, denylist=["V-2"])
+    assert [t["name"] for t in ansible.load_from_str(kept)] == ["stigrule_1_first"]
+    assert [t["name"] for t in ansible.load_from_str(skipped)] == ["stigrule_2_second"]
+
+
+def test_partition_text_keeps_a_header_only_file() -> None:
+    assert StigAnsible(streaming=True).partition_text(
+        text="---\n# No tasks\n", denylist=["1"]) == ("---\n# No tasks\n", "")
+
+
+HANDLER_TASKS: str = ("- name: stigrule_1_first\n"
+                      "  command: /bin/true\n"
+                      "  notify: restart first\n"
+                      "- name: stigrule_2_second\n"
+                      "  command: /bin/true\n"
+                      "  notify: restart second\n")
+HANDLERS: str = ("---\n"
+                 "- name: restart first\n"
+                 "  command: /bin/true\n"
+                 "- name: restart second\n"
+                 "  command: /bin/true\n"
+                 "- name: restart third\n"
+                 "  command: /bin/true\n")
+
+
+@pytest.mark.parametrize("template,kept", [("", False), ("{# restart first #}\n", True)])
+def test_package_removes_handlers_of_skipped_tasks(tmp_path, template: str, kept: bool) -> None:
+    role_zip: str = str(tmp_path / "role.zip")
+    with ZipFile(role_zip, "w") as archive:
+        archive.writestr("roles/r/tasks/main.yml", HANDLER_TASKS)
+        archive.writestr("roles/r/handlers/main.yml", HANDLERS)
+        archive.writestr("roles/r/templates/file.j2", template)
+    ansible: StigAnsible = StigAnsible(streaming=True)
+    tasks, skipped = ansible.partition_text(text=HANDLER_TASKS, denylist=["1"])
+    with StigArchive(role_zip) as role_archive:
+        path: str = ansible.generate_package(
+            role_archive=role_archive, tasks=tasks, skipped=skipped, output_directory=str(tmp_path))
+
+    with ZipFile(path) as package:
+        handlers: str = package.read("roles/r/handlers/main.yml").decode("utf-8")
+    # Only the skipped task notifies the first handler, the third one is not notified at all
+    assert ("- name: restart first\n" in handlers) is kept
+    assert "- name: restart second\n" in handlers
+    assert "- name: restart third\n" in handlers
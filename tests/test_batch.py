@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from stigBatch import StigBatch
+
+
+def touch(path: str) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb"):
+        pass
+    return path
+
+
+def test_library_pairs_by_name(tmp_path) -> None:
+    stig: str = touch(str(tmp_path / "U_X_V1R1_STIG.zip"))
+    ansible: str = touch(str(tmp_path / "U_X_V1R1_STIG_Ansible.zip"))
+    orphan: str = touch(str(tmp_path / "U_Y_V1R1_STIG_Ansible.zip"))
+    pairs, unpaired = StigBatch.find_library(str(tmp_path))
+    assert pairs == {stig: ansible}
+    assert unpaired == [orphan]
+
+
+@pytest.mark.parametrize("name", ["U_X_V1R1_STIG.zip", "U_X_V1R1_STIG_Ansible.zip"])
+def test_library_rejects_duplicate_names(tmp_path, name: str) -> None:
+    touch(str(tmp_path / "a" / name))
+    touch(str(tmp_path / "b" / name.upper().replace(".ZIP", ".zip")))
+    with pytest.raises(Exception, match="same file name"):
+        StigBatch.find_library(str(tmp_path / "*" / "*.zip"))
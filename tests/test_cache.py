@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import pickle
+import struct
+
+from stigCache import (CACHE_EXTENSION, CACHE_HEADER, CACHE_MAGIC,
+                       CACHE_VERSION, StigCache)
+from stigParser import Benchmark
+from stigZip import StigArchive
+from tests.synthetic import StigSynthetic
+
+KEY: str = "0" * 64
+
+
+def entry_path(directory: str) -> str:
+    return os.path.join(directory, KEY + CACHE_EXTENSION)
+
+
+def test_round_trip(tmp_path) -> None:
+    benchmark: Benchmark = Benchmark.from_stream(io.BytesIO(
+        StigSynthetic.generate_xccdf(groups=5, profiles=1)))
+    cache: StigCache = StigCache(str(tmp_path))
+    cache.put(KEY, benchmark)
+    with open(entry_path(str(tmp_path)), "rb") as file:
+        assert struct.unpack(CACHE_HEADER, file.read(struct.calcsize(CACHE_HEADER))) == (CACHE_MAGIC, CACHE_VERSION)
+    cached: Benchmark = cache.get(KEY)  # type: ignore
+    assert cached == benchmark
+    # Interned like the parsed values
+    assert cached.Group[0].Rule.severity is benchmark.Group[0].Rule.severity
+
+
+def test_entries_are_json(tmp_path) -> None:
+    cache: StigCache = StigCache(str(tmp_path))
+    cache.put(KEY, Benchmark.from_stream(io.BytesIO(
+        StigSynthetic.generate_xccdf(groups=1, profiles=1))))
+    with open(entry_path(str(tmp_path)), "rb") as file:
+        file.seek(struct.calcsize(CACHE_HEADER))
+        data: dict = json.loads(file.read())
+    assert data["Group"][0]["@id"] == "V-200000"
+
+
+class Payload:
+
+    path: str
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __reduce__(self):  # type: ignore
+        return (os.mkdir, (self.path,))
+
+
+def test_pickles_are_not_loaded(tmp_path) -> None:
+    # Anyone who can write to a shared cache must not be able to run code
+    cache: StigCache = StigCache(str(tmp_path))
+    marker: str = str(tmp_path / "marker")
+    with open(entry_path(str(tmp_path)), "wb") as file:
+        file.write(struct.pack(CACHE_HEADER, CACHE_MAGIC, CACHE_VERSION))
+        file.write(pickle.dumps(Payload(marker)))
+    assert cache.get(KEY) is None
+    assert os.path.exists(marker) is False
+
+
+def test_other_version_is_dropped(tmp_path) -> None:
+    cache: StigCache = StigCache(str(tmp_path))
+    cache.put(KEY, Benchmark.from_stream(io.BytesIO(
+        StigSynthetic.generate_xccdf(groups=1, profiles=1))))
+    path: str = entry_path(str(tmp_path))
+    with open(path, "r+b") as file:
+        file.write(struct.pack(CACHE_HEADER, CACHE_MAGIC, CACHE_VERSION - 1))
+    assert cache.get(KEY) is None
+    assert os.path.exists(path) is False
+
+
+def test_corrupt_entries_are_dropped(tmp_path) -> None:
+    cache: StigCache = StigCache(str(tmp_path))
+    path: str = entry_path(str(tmp_path))
+    for content in (b"", b"NOTACACHE\x03\x00", struct.pack(CACHE_HEADER, CACHE_MAGIC, CACHE_VERSION) + b"\x80"):
+        with open(path, "wb") as file:
+            file.write(content)
+        assert cache.get(KEY) is None
+        assert os.path.exists(path) is False
+
+
+def test_load_or_parse(tmp_path) -> None:
+    stig_zip, _ = StigSynthetic.generate_zips(
+        directory=str(tmp_path), groups=5, profiles=1, tasks=1)
+    cache: StigCache = StigCache(str(tmp_path / "cache"))
+    with StigArchive(stig_zip) as archive:
+        parsed: Benchmark = cache.load_or_parse(archive=archive)
+        assert len(os.listdir(cache.directory)) == 1
+        assert cache.load_or_parse(archive=archive) == parsed
+
+
+def test_evict_least_recently_used(tmp_path) -> None:
+    cache: StigCache = StigCache(str(tmp_path), max_size=1)
+    for i, key in enumerate(("a", "b")):
+        path: str = os.path.join(str(tmp_path), key + CACHE_EXTENSION)
+        with open(path, "wb") as file:
+            file.write(b"x")
+        os.utime(path, (i, i))
+    cache.evict()
+    assert os.listdir(str(tmp_path)) == ["b" + CACHE_EXTENSION]
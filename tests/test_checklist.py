@@ -0,0 +1,89 @@
+import io
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from stigChecklist import (NOT_APPLICABLE, NOT_REVIEWED, Host,
+                           StigChecklist)
+from stigParser import Benchmark, Preference
+from tests.synthetic import StigSynthetic
+
+XCCDF_NAME: str = "U_Synthetic_Manual_STIG/U_Synthetic_Manual-xccdf.xml"
+
+
+@pytest.fixture
+def checklist() -> StigChecklist:
+    benchmark: Benchmark = Benchmark.from_stream(io.BytesIO(
+        StigSynthetic.generate_xccdf(groups=3, profiles=1)))
+    groups = benchmark.Group
+    preferences: list[Preference] = [
+        Preference(groups[0].id, groups[0].Rule.title, True, ""),
+        Preference(groups[1].id, groups[1].Rule.title, False, "Handled by <the> network & firewall")]
+    return StigChecklist(benchmark=benchmark, preferences=preferences, xccdf_name=XCCDF_NAME)
+
+
+def render(checklist: StigChecklist, host: Host) -> ET.Element:
+    file: io.BytesIO = io.BytesIO()
+    checklist.write(host=host, file=file)
+    return ET.fromstring(file.getvalue())
+
+
+def attributes(vuln: ET.Element) -> dict[str, str]:
+    return {d.findtext("VULN_ATTRIBUTE", ""): d.findtext("ATTRIBUTE_DATA", "") for d in vuln.iter("STIG_DATA")}
+
+
+def test_checklist_document(checklist: StigChecklist) -> None:
+    root: ET.Element = render(checklist, Host("web01", host_ip="10.0.0.1", host_fqdn="web01.example.com"))
+    assert root.tag == "CHECKLIST"
+    assert root.findtext("ASSET/HOST_NAME") == "web01"
+    assert root.findtext("ASSET/HOST_IP") == "10.0.0.1"
+    assert root.findtext("ASSET/HOST_FQDN") == "web01.example.com"
+    assert root.findtext("ASSET/ROLE") == "None"
+
+    info: dict[str, str] = {d.findtext("SID_NAME", ""): d.findtext("SID_DATA", "")
+                            for d in root.iter("SI_DATA")}
+    assert info["stigid"] == "Synthetic_STIG"
+    assert info["filename"] == "U_Synthetic_Manual-xccdf.xml"
+    assert info["releaseinfo"] == "Release: 1 Benchmark Date: 01 Jan 2023"
+
+    # Only the rules with a preference are listed, in the same order
+    vulns: list[ET.Element] = root.findall("STIGS/iSTIG/VULN")
+    assert [attributes(v)["Vuln_Num"] for v in vulns] == [g.id for g in checklist.benchmark.Group[:2]]
+    assert [v.findtext("STATUS") for v in vulns] == [NOT_REVIEWED, NOT_APPLICABLE]
+    assert vulns[0].findtext("COMMENTS") == ""
+    assert vulns[1].findtext("COMMENTS") == "Handled by <the> network & firewall"
+
+
+def test_rule_texts(checklist: StigChecklist) -> None:
+    root: ET.Element = render(checklist, Host("web01"))
+    data: dict[str, str] = attributes(root.findall("STIGS/iSTIG/VULN")[0])
+    rule = checklist.benchmark.Group[0].Rule
+    assert data["Rule_ID"] == rule.id
+    assert data["Severity"] == rule.severity
+    assert data["Check_Content"] == rule.check.check_content
+    assert data["Fix_Text"] == rule.fixtext.text
+    assert data["Vuln_Discuss"].startswith(f"Rule {rule.id.removeprefix('SV-').removesuffix('r1_rule')} protects")
+
+
+def test_generate_from_inventory(tmp_path, checklist: StigChecklist) -> None:
+    inventory: str = str(tmp_path / "inventory.csv")
+    with open(inventory, "w", encoding="utf-8") as file:
+        file.write("Host_Name,host_ip,unknown\nweb01,10.0.0.1,x\ndb/01,10.0.0.2,y\n")
+    assert checklist.generate(inventory_file=inventory, output_directory=str(tmp_path)) == 2
+    assert sorted(os.listdir(tmp_path / "checklists")) == ["db_01.ckl", "web01.ckl"]
+    root: ET.Element = ET.parse(tmp_path / "checklists" / "db_01.ckl").getroot()
+    assert root.findtext("ASSET/HOST_NAME") == "db/01"
+
+
+@pytest.mark.parametrize("content,message", [
+    ("host_ip\n10.0.0.1\n", "host_name column"),
+    ("host_name\nweb01\nWEB01\n", "more than once"),
+    ("host_name,host_ip\n,10.0.0.1\n", "needs a host_name"),
+])
+def test_invalid_inventory(tmp_path, checklist: StigChecklist, content: str, message: str) -> None:
+    inventory: str = str(tmp_path / "inventory.csv")
+    with open(inventory, "w", encoding="utf-8") as file:
+        file.write(content)
+    with pytest.raises(Exception, match=message):
+        checklist.generate(inventory_file=inventory, output_directory=str(tmp_path))
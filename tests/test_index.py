@@ -0,0 +1,55 @@
+import pytest
+
+from stigIndex import StigIndex
+from stigParser import Check, Fix, Fixtext, Group, Rule
+
+
+def group(number: int, severity: str, title: str, check: str = "Verify the setting.") -> Group:
+    rule: Rule = Rule(f"SV-{number}r1_rule", severity, "10.0", Check(check),
+                      f"<VulnDiscussion>{title}</VulnDiscussion>", Fix(f"F-{number}r1_fix"),
+                      Fixtext("Configure the setting.", f"F-{number}r1_fix"), title, f"TEST-00-{number}")
+    return Group(f"V-{number}", rule, "<GroupDescription></GroupDescription>", f"SRG-OS-{number}")
+
+
+@pytest.fixture
+def index() -> StigIndex:
+    return StigIndex([group(1, "high", "Use FIPS 140-2 approved SSH ciphers."),
+                      group(2, "medium", "Audit the SSH daemon configuration."),
+                      group(3, "low", "Mount /tmp with the noexec option."),
+                      group(4, "medium", "Disable USB storage.", check="Run $ grep usb-storage")])
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("ssh", [0, 1]),
+    ("SSH", [0, 1]),
+    ("ssh audit", [1]),
+    ("ssh AND audit", [1]),
+    ("ssh OR usb", [0, 1, 3]),
+    ("NOT ssh", [2, 3]),
+    ("ssh NOT audit", [0]),
+    ("severity:medium", [1, 3]),
+    ("severity:medium NOT usb", [1]),
+    ("(severity:high OR severity:low) tmp", [2]),
+    ("NOT (ssh OR usb)", [2]),
+    ('"FIPS 140-2"', [0]),
+    ("fips 140-2", [0]),
+    ("id:V-3", [2]),
+    ("id:SV-4r1_rule", [3]),
+    ("id:sv-4", [3]),
+    ("id:TEST-00-2", [1]),
+    ("usb-storage", [3]),
+    ("nothing", []),
+    ("", []),
+])
+def test_find(index: StigIndex, query: str, expected: list[int]) -> None:
+    assert index.find(query) == expected
+
+
+@pytest.mark.parametrize("query", ["(ssh", "ssh)", "ssh OR", "AND ssh", "NOT"])
+def test_invalid_query(index: StigIndex, query: str) -> None:
+    with pytest.raises(Exception):
+        index.find(query)
+
+
+def test_search_returns_groups(index: StigIndex) -> None:
+    assert [g.id for g in index.search("severity:medium")] == ["V-2", "V-4"]
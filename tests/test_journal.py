@@ -0,0 +1,84 @@
+from stigJournal import StigJournal
+from stigParser import Preference
+
+
+def test_replay_keeps_last_answer(tmp_path) -> None:
+    path: str = str(tmp_path / "checkpoint.tmp")
+    with StigJournal(path) as journal:
+        journal.record_profile(2)
+        journal.record(Preference("V-1", "Rule 1", True, ""))
+        journal.record(Preference("V-2", "Rule 2", False, "Not used"))
+        journal.record(Preference("V-1", "Rule 1", False, "Changed my mind"))
+
+    replayed: StigJournal = StigJournal(path)
+    replayed.replay()
+    assert replayed.profile == 2
+    assert replayed.preferences == {"V-1": Preference("V-1", "Rule 1", False, "Changed my mind"),
+                                    "V-2": Preference("V-2", "Rule 2", False, "Not used")}
+
+
+def test_replay_skips_torn_write(tmp_path) -> None:
+    path: str = str(tmp_path / "checkpoint.tmp")
+    with StigJournal(path) as journal:
+        journal.record_profile(0)
+        journal.record(Preference("V-1", "Rule 1", True, ""))
+    # A crash in the middle of the last answer
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"id": "V-2", "rule": "Ru')
+
+    recovered: StigJournal = StigJournal(path)
+    recovered.replay()
+    assert list(recovered.preferences) == ["V-1"]
+
+    # Answers given after the crash are not lost to the torn line
+    with recovered:
+        recovered.record(Preference("V-2", "Rule 2", False, "Not used"))
+    replayed: StigJournal = StigJournal(path)
+    replayed.replay()
+    assert replayed.profile == 0
+    assert replayed.preferences["V-2"] == Preference("V-2", "Rule 2", False, "Not used")
+
+
+def test_remove(tmp_path) -> None:
+    path: str = str(tmp_path / "checkpoint.tmp")
+    journal: StigJournal = StigJournal(path)
+    journal.record_profile(1)
+    assert journal.exists()
+    journal.remove()
+    assert journal.exists() is False
+
+
+def test_replay_skips_torn_profile(tmp_path) -> None:
+    path: str = str(tmp_path / "checkpoint.tmp")
+    with StigJournal(path) as journal:
+        journal.record_profile(1)
+        journal.record(Preference("V-1", "Rule 1", True, ""))
+    # A crash while writing "profile:12", the number is cut off
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("profile:1")
+
+    recovered: StigJournal = StigJournal(path)
+    recovered.replay()
+    assert recovered.profile == 1
+
+    # The torn line is cut before the next write, so it never reads as profile 1
+    with recovered:
+        recovered.record(Preference("V-2", "Rule 2", True, ""))
+    with open(path, "r", encoding="utf-8") as file:
+        assert file.read().splitlines()[-2:] == ['{"id": "V-1", "rule": "Rule 1", "applicable": true, "rationale": ""}',
+                                                 '{"id": "V-2", "rule": "Rule 2", "applicable": true, "rationale": ""}']
+    with recovered:
+        recovered.record_profile(3)
+    replayed: StigJournal = StigJournal(path)
+    replayed.replay()
+    assert replayed.profile == 3
+    assert list(replayed.preferences) == ["V-1", "V-2"]
+
+
+def test_replay_skips_empty_profile(tmp_path) -> None:
+    path: str = str(tmp_path / "checkpoint.tmp")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("profile:\nprofile:2\n")
+    replayed: StigJournal = StigJournal(path)
+    replayed.replay()
+    assert replayed.profile == 2
@@ -0,0 +1,35 @@
+import threading
+
+from stigMetrics import Span, StigMetrics
+
+
+def test_untraced_threads_report_to_the_outer_span() -> None:
+    spans: list[Span] = []
+    StigMetrics.add_hook(spans.append)
+    StigMetrics.enable()
+    try:
+        def stage() -> None:
+            with StigMetrics.span("inner"):
+                bytearray(1024 * 1024)
+                sum(range(200000))
+
+        with StigMetrics.span("outer"):
+            thread: threading.Thread = threading.Thread(
+                target=StigMetrics.untraced(stage))
+            thread.start()
+            thread.join()
+    finally:
+        StigMetrics.disable()
+        StigMetrics.remove_hook(spans.append)
+        StigMetrics.reset()
+
+    inner, outer = spans
+    assert inner.peak_memory is None and inner.start_memory is None
+    assert outer.peak_memory is not None and outer.peak_memory >= 1024 * 1024
+    # The outer thread only waits, the CPU time is the worker's
+    assert inner.cpu_time > 0
+    assert outer.cpu_time >= inner.cpu_time
+
+
+def test_untraced_outside_a_span() -> None:
+    assert StigMetrics.untraced(sum)([1, 2]) == 3
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from stigParser import Benchmark, Rule, StigParser
+from tests.synthetic import StigSynthetic
+
+HEAD: str = ('<?xml version="1.0" encoding="{encoding}"?>'
+             '<Benchmark xmlns:dc="http://purl.org/dc/elements/1.1/" id="Test_STIG" xml:lang="en" '
+             'xmlns="http://checklists.nist.gov/xccdf/1.1">'
+             '<status date="2023-01-01">accepted</status>'
+             '<title>Test STIG</title>'
+             '<description>Test benchmark</description>'
+             '<plain-text id="release-info">Release: 1 Benchmark Date: 01 Jan 2023</plain-text>'
+             '<version>1</version>'
+             '<Profile id="MAC-1_Test"><title>Profile</title><description>Profile</description>'
+             '<select idref="V-1" selected="true" /></Profile>')
+GROUP: str = ('<Group id="V-1"><title>SRG-OS-1</title>'
+              '<description>&lt;GroupDescription&gt;&lt;/GroupDescription&gt;</description>'
+              '<Rule id="SV-1r1_rule" weight="10.0" severity="medium">'
+              '<version>TEST-1</version><title>Rule title</title>'
+              '<description>{description}</description>'
+              '<reference><dc:title>Target</dc:title></reference>'
+              '<fixtext fixref="F-1r1_fix">{fixtext}</fixtext>'
+              '<fix id="F-1r1_fix" />'
+              '<check system="C-1r1_chk"><check-content-ref name="M" href="Test.xml" />'
+              '<check-content>{check}</check-content></check>'
+              '</Rule></Group>')
+TAIL: str = '</Benchmark>'
+
+
+def build(description: str = "Description", fixtext: str = "Fix", check: str = "Check", encoding: str = "utf-8") -> str:
+    return HEAD.format(encoding=encoding) + GROUP.format(description=description, fixtext=fixtext, check=check) + TAIL
+
+
+def parse(buffer: bytes) -> Benchmark:
+    return Benchmark.from_stream(io.BytesIO(buffer))
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Line one\r\nLine two\rLine three", "Line one\nLine two\nLine three"),
+    ("<![CDATA[$ sudo grep -i <value> /etc/file && echo]]>", "$ sudo grep -i <value> /etc/file && echo"),
+    ("Before <![CDATA[<b>]]> after", "Before <b> after"),
+    ("Tom &amp; Jerry &lt;tag&gt; &#65;&#x42; &quot;q&quot; &apos;a&apos;", "Tom & Jerry <tag> AB \"q\" 'a'"),
+    ("Text with <xhtml:br xmlns:xhtml=\"http://www.w3.org/1999/xhtml\" /> inline child", "Text with"),
+    ("Text <!-- a comment --> after", "Text  after"),
+    ("  padded  ", "padded"),
+    ("", "None"),
+    ("Unicode éè 中文", "Unicode éè 中文"),
+])
+def test_rule_texts(text: str, expected: str) -> None:
+    rule: Rule = parse(build(description=text, fixtext=text,
+                             check=text).encode("utf-8")).Group[0].Rule
+    assert rule.description == expected
+    assert rule.fixtext.text == expected
+    assert rule.check.check_content == expected
+
+
+def test_declared_encoding() -> None:
+    buffer: bytes = build(description="Café règle",
+                          encoding="ISO-8859-1").encode("iso-8859-1")
+    assert parse(buffer).Group[0].Rule.description == "Café règle"
+
+
+@pytest.mark.parametrize("encoding,bom", [("utf-8", b"\xef\xbb\xbf"), ("utf-16-le", b"\xff\xfe"), ("utf-16-be", b"\xfe\xff")])
+def test_byte_order_mark(encoding: str, bom: bytes) -> None:
+    declared: str = "utf-8" if encoding == "utf-8" else "utf-16"
+    buffer: bytes = bom + build(description="Café",
+                                encoding=declared).encode(encoding)
+    assert parse(buffer).Group[0].Rule.description == "Café"
+
+
+def test_stream_matches_xmltodict() -> None:
+    # The model built from the xmltodict parse, as before the streaming parser
+    xmltodict = pytest.importorskip("xmltodict")
+    buffer: bytes = StigSynthetic.generate_xccdf(groups=20, profiles=3)
+    assert parse(buffer) == StigParser.from_dict(xmltodict.parse(buffer)).Benchmark
+
+
+def test_invalid_document() -> None:
+    with pytest.raises(Exception, match="Invalid XCCDF"):
+        parse(b"<Other><title>Other</title></Other>")
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+from stigBench import IMPORT_BUDGET, LAZY_MODULES
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(*args: str) -> dict[str, int]:
+    # Self time of every module the interpreter imported, in microseconds
+    stderr: str = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT,
+                                 capture_output=True, text=True, check=True).stderr
+    times: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if (line.startswith("import time:") and "|" in line):
+            self_time, _, name = line.removeprefix("import time:").split("|")
+            if (self_time.strip().isdigit()):
+                times[name.strip()] = int(self_time)
+    return times
+
+
+def test_help_import_budget() -> None:
+    bare: dict[str, int] = import_times("-c", "pass")
+    loaded: dict[str, int] = import_times("main.py", "--help")
+    added: dict[str, int] = {m: t for m, t in loaded.items() if m not in bare}
+    assert [m for m in LAZY_MODULES if m in added] == []
+    assert sum(added.values()) / 1_000_000 < IMPORT_BUDGET, sorted(
+        added.items(), key=lambda m: m[1], reverse=True)[:10]
+
+
+def test_batch_does_not_load_the_console() -> None:
+    loaded: dict[str, int] = import_times("-c", "import stigBatch")
+    assert [m for m in ("colorama", "stigPrompt", "ruamel.yaml", "multiprocessing") if m in loaded] == []
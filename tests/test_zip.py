@@ -0,0 +1,150 @@
+import io
+import os
+import struct
+from typing import Any
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import pytest
+
+import stigZip
+from stigZip import (DATA_DESCRIPTOR_FLAG, EXTRA_FIELD_LENGTH, FILENAME_LENGTH,
+                     LOCAL_HEADER_FORMAT, LOCAL_HEADER_SIZE, StigArchive,
+                     _read_exact)
+
+MEMBERS: dict[str, bytes] = {"U_Test_Manual_STIG/": b"",
+                             "U_Test_Manual_STIG/U_Test_Manual-xccdf.xml": b"<Benchmark />",
+                             "U_Test_Manual_STIG/STIG_unclass.xsl": b"<xsl:stylesheet />" * 1024,
+                             "U_Test_Manual_STIG/notes.txt": os.urandom(4096)}
+
+
+class ShortReads(io.RawIOBase):
+
+    def __init__(self, data: bytes) -> None:
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        # One byte at a time, as a pipe or a raw stream may do
+        chunk: bytes = self.data.read(min(1, len(buffer)))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.fixture
+def stig_zip(tmp_path) -> str:
+    path: str = str(tmp_path / "U_Test_STIG.zip")
+    with ZipFile(path, "w") as archive:
+        for i, (name, data) in enumerate(MEMBERS.items()):
+            archive.writestr(name, data, compress_type=ZIP_STORED if i % 2 else ZIP_DEFLATED)
+    return path
+
+
+def repack(stig_zip: str, path: str, raw: bool) -> ZipFile:
+    with StigArchive(stig_zip) as archive:
+        archive.repack(path=path, replacements={archive.xccdf_name: b"<Benchmark></Benchmark>"}, raw=raw)
+    return ZipFile(path)
+
+
+@pytest.mark.parametrize("raw_access", [True, False])
+def test_repack_keeps_members(tmp_path, monkeypatch, stig_zip: str, raw_access: bool) -> None:
+    monkeypatch.setattr(stigZip, "RAW_ACCESS", raw_access and stigZip.RAW_ACCESS)
+    raw: ZipFile = repack(stig_zip, str(tmp_path / "raw.zip"), raw=True)
+    public: ZipFile = repack(stig_zip, str(tmp_path / "public.zip"), raw=False)
+    for archive in (raw, public):
+        assert archive.testzip() is None
+        assert archive.namelist() == list(MEMBERS)
+        for name, data in MEMBERS.items():
+            if (name.endswith("-xccdf.xml") is False):
+                assert archive.read(name) == data
+    assert [i.compress_type for i in raw.infolist()] == [i.compress_type for i in public.infolist()]
+
+
+class Unseekable(io.RawIOBase):
+
+    # zipfile writes data descriptors when it cannot seek back to the header
+    def __init__(self) -> None:
+        self.data = io.BytesIO()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        return self.data.write(data)
+
+
+def compressed_data(path: str) -> dict[str, tuple[int, bytes]]:
+    # CRC and compressed bytes of each member, read from the local headers
+    members: dict[str, tuple[int, bytes]] = {}
+    with ZipFile(path) as archive, open(path, "rb") as file:
+        for item in archive.infolist():
+            file.seek(item.header_offset)
+            header: tuple = struct.unpack(LOCAL_HEADER_FORMAT, file.read(LOCAL_HEADER_SIZE))
+            file.seek(header[FILENAME_LENGTH] + header[EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+            members[item.filename] = (item.CRC, file.read(item.compress_size))
+    return members
+
+
+@pytest.mark.skipif(stigZip.RAW_ACCESS is False, reason="raw member access is not available")
+def test_raw_copy_keeps_compressed_bytes(tmp_path) -> None:
+    # A low compression level, so that compressing again gives other bytes
+    source: str = str(tmp_path / "U_Test_STIG.zip")
+    with ZipFile(source, "w", compression=ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    raw: ZipFile = repack(source, str(tmp_path / "raw.zip"), raw=True)
+    repack(source, str(tmp_path / "public.zip"), raw=False)
+
+    expected: dict[str, tuple[int, bytes]] = compressed_data(source)
+    copied: dict[str, tuple[int, bytes]] = compressed_data(raw.filename)  # type: ignore
+    recompressed: dict[str, tuple[int, bytes]] = compressed_data(str(tmp_path / "public.zip"))
+    xsl: str = "U_Test_Manual_STIG/STIG_unclass.xsl"
+    for name in MEMBERS:
+        if (name.endswith("-xccdf.xml") is False):
+            assert copied[name] == expected[name]
+    assert recompressed[xsl][1] != expected[xsl][1]
+
+
+@pytest.mark.skipif(stigZip.RAW_ACCESS is False, reason="raw member access is not available")
+def test_raw_copy_of_data_descriptor_member(tmp_path) -> None:
+    stream: Unseekable = Unseekable()
+    with ZipFile(stream, "w", compression=ZIP_DEFLATED) as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    source: str = str(tmp_path / "U_Test_STIG.zip")
+    with open(source, "wb") as file:
+        file.write(stream.data.getvalue())
+    with ZipFile(source) as archive:
+        assert all(i.flag_bits & DATA_DESCRIPTOR_FLAG for i in archive.infolist())
+
+    raw: ZipFile = repack(source, str(tmp_path / "raw.zip"), raw=True)
+    assert raw.testzip() is None
+    expected: dict[str, tuple[int, bytes]] = compressed_data(source)
+    copied: dict[str, tuple[int, bytes]] = compressed_data(raw.filename)  # type: ignore
+    for item in raw.infolist():
+        if (item.filename.endswith("-xccdf.xml") is False):
+            # Sizes and CRC are in the header, the descriptor is dropped
+            assert item.flag_bits & DATA_DESCRIPTOR_FLAG == 0
+            assert copied[item.filename] == expected[item.filename]
+            assert raw.read(item) == MEMBERS[item.filename]
+
+
+@pytest.mark.parametrize("raw_access", [True, False])
+def test_nested_stored_zip(tmp_path, monkeypatch, stig_zip: str, raw_access: bool) -> None:
+    monkeypatch.setattr(stigZip, "RAW_ACCESS", raw_access and stigZip.RAW_ACCESS)
+    ansible_zip: str = str(tmp_path / "U_Test_STIG_Ansible.zip")
+    with ZipFile(ansible_zip, "w") as archive:
+        archive.writestr("readme.txt", "x" * 1000, compress_type=ZIP_DEFLATED)
+        with open(stig_zip, "rb") as file:
+            archive.writestr("test-ansible.zip", file.read(), compress_type=ZIP_STORED)
+    with StigArchive(ansible_zip) as archive:
+        role_archive: StigArchive = archive.open_ansible_zip()  # type: ignore
+        with role_archive:
+            assert role_archive.read_xccdf() == b"<Benchmark />"
+
+
+def test_read_exact_retries_short_reads() -> None:
+    assert _read_exact(ShortReads(b"0123456789"), 10) == b"0123456789"
+    with pytest.raises(Exception):
+        _read_exact(ShortReads(b"0123"), 10)